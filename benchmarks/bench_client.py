@@ -0,0 +1,145 @@
+"""Load-test the client against the local mock multiworld server.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_client --rooms 1 100 1000
+
+For each room count this measures how long the lobby snapshot takes, the
+memory held per Game, chat throughput and handler latency with every room
+subscribed, and how long it takes every socket to come back after the
+server drops them.  Memory is measured by feeding the same lobby entries
+and world descriptions straight to the handlers, so it covers the model
+and registry but not the sockets.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import time
+import tracemalloc
+
+from pyz3multi.bot import MultiworldBot
+from pyz3multi.mockserver import MockMultiworldServer
+from pyz3multi.types import MessageType
+from pyz3multi.websocket import Game
+
+class BenchGame(Game):
+    __slots__ = ()
+
+    handlers = dict(Game.handlers)
+    handlers[MessageType.Chat.value] = 'on_chat'
+
+    async def on_chat(self, payload):
+        stats = self.bot.stats
+        stats['latencies'].append(time.perf_counter() - payload['benchSent'])
+        if len(stats['latencies']) >= stats['expected']:
+            stats['done'].set()
+
+class BenchBot(MultiworldBot):
+    game_class = BenchGame
+
+async def wait_for(predicate, timeout, interval=0.005):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise asyncio.TimeoutError()
+        await asyncio.sleep(interval)
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+async def measure_memory(server):
+    bot = BenchBot(token='bench', name='bench', base_address=server.base_address)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for room in server.rooms.values():
+        await bot.lobby.on_lobby_entry(room.entry())
+        game = bot.games[room.guid]
+        for world, description in room.worlds.items():
+            await game.on_world_description(dict(description, world=world))
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used // max(len(server.rooms), 1)
+
+async def run(rooms, messages, timeout, reconnect_rate):
+    result = {'rooms': rooms}
+    server = await MockMultiworldServer().start()
+    for i in range(rooms):
+        server.add_room(name=f'Bench room {i}')
+
+    bot = BenchBot(
+        token='bench',
+        name='bench',
+        base_address=server.base_address,
+        max_connections_per_host=rooms,
+        reconnect_rate=reconnect_rate,
+        reconnect_burst=reconnect_rate
+    )
+    bot.stats = {'latencies': [], 'expected': 0, 'done': asyncio.Event()}
+
+    result['bytes_per_game'] = await measure_memory(server)
+
+    start = time.perf_counter()
+    await bot.start()
+    await wait_for(lambda: len(bot.games) == rooms, timeout)
+    result['lobby_snapshot_ms'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    await asyncio.gather(*[bot.subscribe(game) for game in bot.games.values()])
+    await wait_for(lambda: all(len(game.worlds) == server.world_count for game in bot.games.values()), timeout)
+    result['subscribe_ms'] = (time.perf_counter() - start) * 1000
+
+    # chat throughput and handler latency
+    bot.stats['expected'] = rooms * messages
+    start = time.perf_counter()
+    for _ in range(messages):
+        for room in server.rooms.values():
+            server.broadcast(room.sockets, {'type': MessageType.Chat.value, 'body': 'bench', 'benchSent': time.perf_counter()})
+        await asyncio.sleep(0)
+    await asyncio.wait_for(bot.stats['done'].wait(), timeout)
+    elapsed = time.perf_counter() - start
+    latencies = bot.stats['latencies']
+    result['messages_per_sec'] = len(latencies) / elapsed
+    result['latency_p50_ms'] = percentile(latencies, 50) * 1000
+    result['latency_p99_ms'] = percentile(latencies, 99) * 1000
+
+    # every socket dropped at once
+    knocks = server.received.get(MessageType.Knock.value, 0)
+    start = time.perf_counter()
+    await server.drop_connections()
+    await wait_for(lambda: server.received.get(MessageType.Knock.value, 0) >= knocks + rooms, timeout)
+    result['reconnect_ms'] = (time.perf_counter() - start) * 1000
+
+    await bot.close()
+    await server.stop()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, nargs='+', default=[1, 100, 1000])
+    parser.add_argument('--messages', type=int, default=20, help='chat messages sent to each room')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--reconnect-rate', type=float, default=200, help='reconnects per second allowed by the bot')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # every room needs a socket on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    results = [asyncio.run(run(rooms, args.messages, args.timeout, args.reconnect_rate)) for rooms in args.rooms]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = ['rooms', 'lobby_snapshot_ms', 'subscribe_ms', 'bytes_per_game', 'messages_per_sec', 'latency_p50_ms', 'latency_p99_ms', 'reconnect_ms']
+    print('  '.join(f'{c:>17}' for c in columns))
+    for result in results:
+        print('  '.join(f'{result[c]:>17.1f}' if isinstance(result[c], float) else f'{result[c]:>17}' for c in columns))
+
+if __name__ == "__main__":
+    main()
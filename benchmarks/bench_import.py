@@ -0,0 +1,107 @@
+"""Measure how long the package takes to import.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import --runs 20 --budget-ms 5
+
+Each module is imported in a fresh interpreter, ``--runs`` times, and the
+median wall time of the import statement is reported along with how many
+modules it loaded.  ``import pyz3multi`` should stay cheap: the package
+loads its public names lazily, so it mustn't pull in asyncio or
+websockets.  With ``--budget-ms`` the run fails if it takes longer than
+that, or if it loads either of them.  ``--profile`` prints the slowest
+modules from ``python -X importtime`` for each target.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULES = ['pyz3multi', 'pyz3multi.types', 'pyz3multi.websocket', 'pyz3multi.bot', 'pyz3multi.oneshot']
+
+# must not be loaded by a bare ``import pyz3multi``
+HEAVY = ['asyncio', 'websockets', 'pyz3multi.websocket']
+
+PROBE = '''
+import sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = set(sys.modules) - before
+print(elapsed, len(loaded), ','.join(sorted(name for name in {heavy!r} if name in loaded)))
+'''
+
+def measure(module, runs):
+    times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY)],
+            check=True, capture_output=True, text=True
+        ).stdout.split(' ')
+        times.append(float(output[0]) * 1000)
+    return {
+        'module': module,
+        'median_ms': statistics.median(times),
+        'min_ms': min(times),
+        'modules_loaded': int(output[1]),
+        'heavy_loaded': [name for name in output[2].strip().split(',') if name],
+    }
+
+def importtime(statement):
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        check=True, capture_output=True, text=True
+    ).stderr
+    entries = []
+    for line in stderr.splitlines()[1:]:
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        entries.append((int(self_us), int(cumulative_us), name.strip()))
+    return entries
+
+def profile(module, top):
+    """The ``top`` modules with the most self time under ``python -X importtime``."""
+    # leave out what the interpreter imports at startup
+    startup = {name for _, _, name in importtime('pass')}
+    entries = [entry for entry in importtime(f'import {module}') if entry[2] not in startup]
+    return sorted(entries, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, help='fail if import pyz3multi takes longer than this')
+    parser.add_argument('--profile', type=int, metavar='N', default=0, help='show the N slowest modules for each target')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = [measure(module, args.runs) for module in args.modules]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        columns = ['module', 'median_ms', 'min_ms', 'modules_loaded']
+        print('  '.join(f'{c:>20}' for c in columns))
+        for result in results:
+            print('  '.join(f'{result[c]:>20.1f}' if isinstance(result[c], float) else f'{result[c]:>20}' for c in columns))
+
+    for module in args.modules if args.profile else []:
+        print(f'\n{module}: slowest modules (self us, cumulative us)')
+        for self_us, cumulative_us, name in profile(module, args.profile):
+            print(f'{self_us:>10} {cumulative_us:>10}  {name}')
+
+    if args.budget_ms is not None:
+        package = next((r for r in results if r['module'] == 'pyz3multi'), None) or measure('pyz3multi', args.runs)
+        failures = []
+        if package['median_ms'] > args.budget_ms:
+            failures.append(f"import pyz3multi took {package['median_ms']:.1f}ms, over the {args.budget_ms:.1f}ms budget")
+        if package['heavy_loaded']:
+            failures.append(f"import pyz3multi loaded {', '.join(package['heavy_loaded'])}")
+        for failure in failures:
+            print(failure, file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+__version__ = '0.0.1'
+
+# Nothing is imported until it's used (PEP 562), so ``import pyz3multi``
+# doesn't pull in asyncio and websockets; benchmarks/bench_import.py keeps
+# an eye on that.  Maps each public name to the module it lives in.
+_LAZY = {
+    'MultiworldBot': 'pyz3multi.bot',
+    'BotPool': 'pyz3multi.pool',
+    'FleetBot': 'pyz3multi.fleet',
+    'Lobby': 'pyz3multi.websocket',
+    'Game': 'pyz3multi.websocket',
+    'World': 'pyz3multi.websocket',
+    'Player': 'pyz3multi.websocket',
+    'MessageType': 'pyz3multi.types',
+    'GameMode': 'pyz3multi.types',
+    'ItemType': 'pyz3multi.types',
+    'ImportType': 'pyz3multi.types',
+    'pyz3multiException': 'pyz3multi.exceptions',
+    'PendingRequestEvicted': 'pyz3multi.exceptions',
+    'ConnectionLimitReached': 'pyz3multi.exceptions',
+    'GameState': 'pyz3multi.gamestate',
+    'SeedGenerator': 'pyz3multi.seedgen',
+    'Recorder': 'pyz3multi.replay',
+    'Replayer': 'pyz3multi.replay',
+    'setup_logging': 'pyz3multi.logs',
+}
+
+__all__ = ['__version__', *_LAZY]
+
+def __getattr__(name):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    import importlib
+    value = getattr(importlib.import_module(module), name)
+    # cache it so the next lookup doesn't come back here
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
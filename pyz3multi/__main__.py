@@ -0,0 +1,103 @@
+import argparse
+import logging
+import os
+
+from pyz3multi.logs import setup_logging
+
+parser = argparse.ArgumentParser(prog='python -m pyz3multi', description='Run a multiworld bot until interrupted, or run a single command and exit.')
+parser.add_argument('--token', default=os.getenv('BOT_TOKEN'), help='bot token (default: $BOT_TOKEN)')
+parser.add_argument('--name', default=os.getenv('BOT_NAME'), help='bot name (default: $BOT_NAME)')
+parser.add_argument('--base-address', default='wss://mw.alttpr.com')
+parser.add_argument('--state-path', help='SQLite file to keep the game registry in across restarts')
+parser.add_argument('--record', help='record all traffic to this file')
+parser.add_argument('--metrics-port', type=int, help='serve Prometheus metrics on this port')
+parser.add_argument('--no-uvloop', action='store_true', help="don't use uvloop even if it's installed")
+parser.add_argument('--debug', action='store_true', help='asyncio debug mode')
+parser.add_argument('--slow-callback', type=float, help='log callbacks slower than this many seconds (needs --debug)')
+parser.add_argument('--executor-workers', type=int, help='threads in the default executor')
+parser.add_argument('--log-level', default='INFO')
+parser.add_argument('--log-json', action='store_true', help='log JSON lines')
+parser.add_argument('--timeout', type=float, default=30, help='give up on a one-shot command after this many seconds')
+parser.add_argument('--log-rate', type=float, help='log at most this many frames per second of each message type')
+
+# one-shot commands, see pyz3multi.oneshot
+commands = parser.add_subparsers(dest='command', metavar='command', help='send one payload and exit instead of running the bot')
+create = commands.add_parser('create', help='create a room and print its creation token (or GUID with --wait)')
+create.add_argument('room_name')
+create.add_argument('description')
+create.add_argument('--password')
+create.add_argument('--wait', action='store_true', help='wait for the room to be ready and print its GUID')
+destroy = commands.add_parser('destroy', help='destroy a room')
+destroy.add_argument('guid')
+destroy.add_argument('--password')
+destroy.add_argument('--save', action='store_true')
+records = commands.add_parser('import', help='import a records file into a room')
+records.add_argument('guid')
+records.add_argument('path')
+records.add_argument('--password')
+chat = commands.add_parser('chat', help='send a chat message to a room')
+chat.add_argument('guid')
+chat.add_argument('body')
+chat.add_argument('--password')
+
+args = parser.parse_args()
+
+if not args.token or not args.name:
+    parser.error('a bot token and name are required')
+
+listener = setup_logging(args.log_level.upper(), structured=args.log_json, rate=args.log_rate)
+
+if args.command is not None:
+    import asyncio
+    from pyz3multi import oneshot
+
+    bot = oneshot.make_bot(
+        args.token,
+        args.name,
+        listen=args.command == 'create' and args.wait,
+        base_address=args.base_address,
+        record_path=args.record,
+        request_timeout=args.timeout
+    )
+    if args.command == 'create':
+        call = oneshot.run(bot, oneshot.create, args.room_name, args.description, password=args.password, wait=args.wait)
+    elif args.command == 'destroy':
+        call = oneshot.run(bot, oneshot.destroy, args.guid, password=args.password, save=args.save)
+    elif args.command == 'import':
+        call = oneshot.run(bot, oneshot.import_records, args.guid, args.path, password=args.password)
+    else:
+        call = oneshot.run(bot, oneshot.chat, args.guid, args.body, password=args.password)
+
+    try:
+        result = asyncio.run(call)
+    except Exception as e:
+        logging.getLogger('pyz3multi').error(f'{args.command} failed: {e!r}')
+        listener.stop()
+        raise SystemExit(1)
+    if result is not None:
+        print(result)
+    listener.stop()
+    raise SystemExit(0)
+
+from pyz3multi.bot import MultiworldBot
+
+bot = MultiworldBot(
+    args.token,
+    args.name,
+    base_address=args.base_address,
+    state_path=args.state_path,
+    record_path=args.record
+)
+
+coros = []
+if args.metrics_port is not None:
+    coros.append(bot.serve_metrics(port=args.metrics_port))
+
+bot.run(
+    *coros,
+    uvloop=False if args.no_uvloop else None,
+    debug=args.debug,
+    slow_callback_duration=args.slow_callback,
+    executor_workers=args.executor_workers
+)
+listener.stop()
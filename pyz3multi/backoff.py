@@ -72,4 +72,34 @@ class ExponentialBackoff:
             self._exp = 0
 
         self._exp = min(self._exp + 1, self._max)
-        return self._randfunc(0, self._base * 2 ** self._exp)
\ No newline at end of file
+        return self._randfunc(0, self._base * 2 ** self._exp)
+
+class DecorrelatedJitterBackoff:
+    """Exponential backoff with decorrelated jitter.
+    Each delay is drawn uniformly between base and three times the
+    previous delay, capped at cap. Clients that fail at the same moment
+    quickly drift apart instead of retrying in lockstep.
+    Parameters
+    ----------
+    base: float
+        The smallest delay in seconds.
+    cap: float
+        The largest delay in seconds.
+    """
+
+    def __init__(self, base=1, cap=60):
+        self._base = base
+        self._cap = cap
+        self._last = base
+
+        # Use our own random instance to avoid messing with global one
+        self._rand = random.Random()
+        self._rand.seed()
+
+    def reset(self):
+        self._last = self._base
+
+    def delay(self):
+        """Compute the next delay."""
+        self._last = min(self._cap, self._rand.uniform(self._base, self._last * 3))
+        return self._last
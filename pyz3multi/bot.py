@@ -1,13 +1,79 @@
 import asyncio
 import pyz3multi.websocket
+from pyz3multi.bulk import BulkRunner
+from pyz3multi.connection import ConnectionManager
+from pyz3multi.events import EventRouter
+from pyz3multi.metrics import Metrics, MetricsExporter
+from pyz3multi.reconnect import ReconnectScheduler
+from pyz3multi.registry import GameRegistry
 from pyz3multi.types import MessageType
 
 class MultiworldBot():
-    def __init__(self, token, name):
-        self.lobby = pyz3multi.websocket.Lobby(bot=self)
-        self.games = {}
+    lobby_class = pyz3multi.websocket.Lobby
+    game_class = pyz3multi.websocket.Game
+
+    def __init__(self, token, name, max_connections_per_host=100, idle_timeout=60, dispatch_high_water=1000, dispatch_workers=1, request_timeout=60, flush_timeout=5, base_address='wss://mw.alttpr.com', reconnect_rate=20, reconnect_burst=20, heartbeat_interval=20, heartbeat_timeout=10, state_path=None, state_interval=60, reconcile_delay=10, peek_threshold=65536, bulk_concurrency=50, bulk_rate=20, record_path=None, send_rate=None, send_burst=None, listen=True, lobby_snapshot=True, connection_slot_timeout=10):
         self.token = token
         self.name = name
+        self.base_address = base_address
+        self.dispatch_high_water = dispatch_high_water
+        self.dispatch_workers = dispatch_workers
+        self.request_timeout = request_timeout
+        self.flush_timeout = flush_timeout
+        # per-connection outbound rate limit, see SendQueue
+        self.send_rate = send_rate
+        self.send_burst = send_burst
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        # a bot with listen off never reads its sockets: sends go out but
+        # no handler runs, for fire-and-forget commands (see pyz3multi.oneshot)
+        self.listen = listen
+        # whether the lobby asks for every room when it connects
+        self.lobby_snapshot = lobby_snapshot
+        # the state cache and recorder are imported only when they're used,
+        # to keep startup quick for short-lived processes
+        if state_path is not None:
+            from pyz3multi.cache import StateCache
+            self.state = StateCache(state_path)
+        else:
+            self.state = None
+        self.state_interval = state_interval
+        self.reconcile_delay = reconcile_delay
+        # games loaded from the state cache that the lobby hasn't confirmed yet
+        self.restored = set()
+        self._state_task = None
+        # at most max_connections_per_host Game sockets (the lobby's isn't
+        # counted); past that, subscribing or sending to another game waits
+        # connection_slot_timeout seconds for one to close and then raises
+        # ConnectionLimitReached
+        self.connections = ConnectionManager(
+            max_per_host=max_connections_per_host,
+            idle_timeout=idle_timeout,
+            slot_timeout=connection_slot_timeout
+        )
+        self.metrics = Metrics()
+        self.events = EventRouter()
+        self.peek_threshold = peek_threshold
+        self.reconnects = ReconnectScheduler(rate=reconnect_rate, burst=reconnect_burst)
+        self.bulk = BulkRunner(concurrency=bulk_concurrency, rate=bulk_rate)
+        # every frame sent and received goes here, see pyz3multi.replay
+        if record_path is not None:
+            from pyz3multi.replay import Recorder
+            self.recorder = Recorder(record_path)
+        else:
+            self.recorder = None
+        self.lobby = self.lobby_class(bot=self)
+        self.games = GameRegistry()
+
+    def on(self, message_type, game=None, mode=None):
+        """Decorator registering ``func(client, payload)`` for a MessageType.
+
+        ``game`` (a Game or GUID) and ``mode`` narrow it down to matching
+        rooms.  Frames that no listener and no built-in handler want are
+        dropped before they're fully decoded.  Frames of ``peek_threshold``
+        bytes or more are decoded lazily, see ``codec.LazyPayload``.
+        """
+        return self.events.on(message_type, game=game, mode=mode)
 
     def get_game(self, guid):
         try:
@@ -15,5 +81,110 @@ class MultiworldBot():
         except KeyError:
             return None
 
+    async def subscribe(self, game, subscriber=None):
+        await self.connections.subscribe(game, subscriber)
+
+    async def unsubscribe(self, game, subscriber=None):
+        await self.connections.unsubscribe(game, subscriber)
+
+    def create_many(self, rooms, timeout=None):
+        """Create a room for each dict of ``Lobby.create`` arguments.
+
+        Returns a BulkResult whose futures resolve to the new Games.
+        """
+        async def create(room):
+            return await (await self.lobby.create(timeout=timeout, **room))
+        return self.bulk.run(rooms, create, lambda room: self.lobby.endpoint)
+
+    def destroy_many(self, games, save=False):
+        async def destroy(game):
+            return await (await game.destroy(save=save))
+        return self.bulk.run(games, destroy, lambda game: game.endpoint)
+
+    def claim_many(self, worlds, claim=True):
+        async def send(world):
+            return await (await (world.claim() if claim else world.unclaim()))
+        return self.bulk.run(worlds, send, lambda world: world.game.endpoint)
+
+    def kick_many(self, players, reason, resolution):
+        async def kick(player):
+            return await (await player.kick(reason=reason, resolution=resolution))
+        return self.bulk.run(players, kick, lambda player: player.game.endpoint)
+
+    def game_states(self, guids=None):
+        """Snapshots of tracked gameplay, by game GUID, for games that have seen any."""
+        games = self.games.values() if guids is None else filter(None, map(self.get_game, guids))
+        return {game.game: game.state.snapshot() for game in games if game.state is not None}
+
+    def latency(self):
+        """Heartbeat round-trip histograms for every open connection, by endpoint."""
+        clients = [self.lobby] + [game for game in self.games.values() if game.socket is not None]
+        return {client.endpoint: client.heartbeat.rtt.snapshot() for client in clients}
+
+    def gauges(self):
+        clients = [self.lobby] + list(self.games.values())
+        dispatch = [c.dispatcher.depth for c in clients if c.dispatcher is not None]
+        sends = [len(c.sender) for c in clients]
+        return {
+            'games': len(self.games),
+            'open_connections': self.connections.open_count,
+            'dispatch_queue_depth': sum(dispatch),
+            'dispatch_queue_depth_max': max(dispatch, default=0),
+            'send_queue_depth': sum(sends),
+            'send_queue_depth_max': max(sends, default=0),
+            'reconnects_total': self.reconnects.reconnects,
+            'reconnects_pending': len(self.reconnects),
+        }
+
+    async def serve_metrics(self, host='127.0.0.1', port=9100):
+        """Serve Prometheus text at /metrics and JSON at /metrics.json."""
+        return await MetricsExporter(self, host, port).start()
+
+    def run(self, *coros, uvloop=None, debug=False, slow_callback_duration=None, executor_workers=None):
+        """Run the bot, and any ``coros`` alongside it, until SIGINT or SIGTERM.
+
+        Blocks until then, and closes the bot gracefully on the way out:
+        queued payloads get ``flush_timeout`` seconds to go out and every
+        socket is closed in parallel.  uvloop is used when it's installed
+        unless ``uvloop=False``.  ``debug``, ``slow_callback_duration`` and
+        ``executor_workers`` tune the event loop.
+        """
+        from pyz3multi import runner
+        runner.run(
+            self, *coros,
+            uvloop=uvloop,
+            debug=debug,
+            slow_callback_duration=slow_callback_duration,
+            executor_workers=executor_workers
+        )
+
     async def start(self):
-        await self.lobby.connect()
\ No newline at end of file
+        if self.state is not None:
+            self.restored = await self.state.load(self)
+            self._state_task = asyncio.create_task(self._maintain_state())
+        await self.connections.subscribe(self.lobby)
+
+    async def _maintain_state(self):
+        await asyncio.sleep(self.reconcile_delay)
+        await self.reconcile()
+        while True:
+            await asyncio.sleep(self.state_interval)
+            await self.state.save(self)
+
+    async def reconcile(self):
+        """Drop restored games that the lobby hasn't mentioned since startup."""
+        stale, self.restored = self.restored, set()
+        for guid in stale:
+            await self.lobby.cleanup_game({'game': guid})
+
+    async def close(self):
+        if self._state_task is not None:
+            self._state_task.cancel()
+            self._state_task = None
+        self.reconnects.cancel_all()
+        self.lobby.pending.cancel_all()
+        await self.connections.close_all()
+        if self.state is not None:
+            await self.state.save(self)
+        if self.recorder is not None:
+            self.recorder.close()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+
+from pyz3multi.ratelimit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+class BulkResult():
+    """The outcome of a bulk operation: one future per item, in input order.
+
+    Await it (or ``wait()``) to wait for every item; a failing item never
+    cancels the others.  Afterwards ``succeeded`` and ``failed`` split the
+    items into ``(item, result)`` and ``(item, exception)`` pairs.
+    """
+
+    def __init__(self, items, futures):
+        self.items = items
+        self.futures = futures
+
+    def __len__(self):
+        return len(self.futures)
+
+    def __iter__(self):
+        return iter(zip(self.items, self.futures))
+
+    def __await__(self):
+        return self.wait().__await__()
+
+    async def wait(self, timeout=None):
+        if self.futures:
+            await asyncio.wait(self.futures, timeout=timeout)
+        return self
+
+    @property
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    @property
+    def succeeded(self):
+        return [
+            (item, future.result()) for item, future in self
+            if future.done() and not future.cancelled() and future.exception() is None
+        ]
+
+    @property
+    def failed(self):
+        return [
+            (item, asyncio.CancelledError() if future.cancelled() else future.exception()) for item, future in self
+            if future.done() and (future.cancelled() or future.exception() is not None)
+        ]
+
+    def results(self):
+        """Results in input order, with the exception in place of failed items."""
+        return [
+            asyncio.CancelledError() if future.cancelled() else (future.exception() or future.result())
+            for future in self.futures
+        ]
+
+class BulkRunner():
+    """Runs one coroutine per item with bounded concurrency and per-endpoint rate limits.
+
+    At most ``concurrency`` items are in flight at once across every bulk
+    operation on the bot, and each endpoint gets its own token bucket
+    allowing ``rate`` operations per second (``burst`` at once), so a
+    tournament's worth of claims spread over many rooms goes out in
+    parallel while no single room gets flooded.  ``rate=None`` turns the
+    rate limit off.
+    """
+
+    def __init__(self, concurrency=50, rate=20, burst=None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self._semaphore = None
+        self._buckets = {}
+
+    def bucket(self, endpoint):
+        try:
+            return self._buckets[endpoint]
+        except KeyError:
+            bucket = self._buckets[endpoint] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def forget(self, endpoint):
+        self._buckets.pop(endpoint, None)
+
+    def run(self, items, func, endpoint):
+        """Start ``func(item)`` for every item and return a BulkResult.
+
+        ``endpoint(item)`` names the connection the item's request goes to.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        items = list(items)
+        futures = [asyncio.ensure_future(self._run_one(item, func, endpoint(item))) for item in items]
+        return BulkResult(items, futures)
+
+    async def _run_one(self, item, func, endpoint):
+        async with self._semaphore:
+            if self.rate is not None:
+                await self.bucket(endpoint).acquire()
+            try:
+                return await func(item)
+            except Exception as e:
+                log.warning(f'Bulk operation on {endpoint} failed for {item!r}: {e!r}')
+                raise
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime
+
+from pyz3multi import codec
+from pyz3multi.websocket import Player, World, intern_settings
+
+log = logging.getLogger(__name__)
+
+# bump whenever the tables below change; older snapshots are ignored
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS games (
+    guid TEXT PRIMARY KEY,
+    name TEXT,
+    description TEXT,
+    has_password INTEGER,
+    world_count INTEGER,
+    created REAL,
+    mode INTEGER,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS worlds (
+    guid TEXT,
+    world INTEGER,
+    title TEXT,
+    description TEXT,
+    rng TEXT,
+    mystery INTEGER,
+    logic TEXT,
+    goals TEXT,
+    gameplay TEXT,
+    difficulty TEXT,
+    claimed INTEGER,
+    PRIMARY KEY (guid, world)
+);
+CREATE TABLE IF NOT EXISTS players (
+    guid TEXT,
+    player_id TEXT,
+    name TEXT,
+    PRIMARY KEY (guid, player_id)
+);
+"""
+
+def _settings_columns(source, settings):
+    """Encode a world's four settings columns; runs on the writer thread."""
+    if source is not None:
+        # the WorldDescription hasn't been decoded yet, read a throwaway
+        # copy of it rather than making the World load its settings
+        payload = codec.loads(source.frame)
+        settings = [payload.get(name) for name in World.SETTINGS]
+    return tuple(json.dumps(value or {}) for value in settings)
+
+class StateCache():
+    """An on-disk SQLite snapshot of a bot's games, worlds, claims and players.
+
+    Loading a snapshot on startup means the registry is populated before the
+    lobby has said a word; the lobby's own snapshot then only has to
+    correct what changed while the bot was down.  Room passwords are not
+    written to disk.  Snapshots written by a different ``SCHEMA_VERSION``
+    are discarded.  All database work runs in the default executor so the
+    event loop never blocks on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.executescript(SCHEMA)
+        row = db.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is None or int(row[0]) != SCHEMA_VERSION:
+            if row is not None:
+                log.info(f'Discarding state cache {self.path} written by schema version {row[0]}')
+            with db:
+                db.execute('DELETE FROM games')
+                db.execute('DELETE FROM worlds')
+                db.execute('DELETE FROM players')
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        return db
+
+    async def save(self, bot):
+        """Replace the snapshot with the bot's current games."""
+        games, worlds, players = [], [], []
+        now = time.time()
+        for guid, game in bot.games.items():
+            created = game._created
+            if isinstance(created, datetime):
+                created = created.timestamp()
+            games.append((
+                guid, game.name, game.description, game.has_password, game.world_count,
+                created, game.mode, now
+            ))
+            for world in game.worlds.values():
+                # settings are encoded in the executor, and lazily held
+                # ones are left undecoded on the World
+                worlds.append((
+                    guid, world.world, world.title, world.description, world.rng, world.mystery,
+                    world._source, (world._logic, world._goals, world._gameplay, world._difficulty),
+                    world.claimed
+                ))
+            for player in game.players.values():
+                players.append((guid, player.player_id, player.name))
+
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self._write, games, worlds, players)
+        log.debug(f'Saved {len(games)} games to {self.path}')
+
+    def _write(self, games, worlds, players):
+        worlds = [row[:6] + _settings_columns(row[6], row[7]) + row[8:] for row in worlds]
+        db = self._connect()
+        try:
+            with db:
+                db.execute('DELETE FROM games')
+                db.execute('DELETE FROM worlds')
+                db.execute('DELETE FROM players')
+                db.executemany('INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?)', games)
+                db.executemany('INSERT INTO worlds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', worlds)
+                db.executemany('INSERT INTO players VALUES (?, ?, ?)', players)
+        finally:
+            db.close()
+
+    def _read(self):
+        db = self._connect()
+        try:
+            return (
+                db.execute('SELECT guid, name, description, has_password, world_count, created, mode FROM games').fetchall(),
+                db.execute('SELECT * FROM worlds').fetchall(),
+                db.execute('SELECT * FROM players').fetchall(),
+            )
+        finally:
+            db.close()
+
+    async def load(self, bot):
+        """Add the snapshot's games to ``bot.games`` and return their GUIDs."""
+        loop = asyncio.get_event_loop()
+        games, worlds, players = await loop.run_in_executor(None, self._read)
+
+        restored = set()
+        for guid, name, description, has_password, world_count, created, mode in games:
+            if guid in bot.games:
+                continue
+            bot.games[guid] = bot.game_class(
+                bot=bot,
+                name=name,
+                description=description,
+                has_password=bool(has_password),
+                game=guid,
+                world_count=world_count,
+                created=created,
+                mode=mode
+            )
+            restored.add(guid)
+
+        for guid, world_id, title, description, rng, mystery, logic, goals, gameplay, difficulty, claimed in worlds:
+            if guid not in restored:
+                continue
+            game = bot.games[guid]
+            world = World(
+                game=game,
+                world=world_id,
+                title=title,
+                description=description,
+                rng=rng,
+                mystery=bool(mystery),
+                logic=intern_settings(json.loads(logic)),
+                goals=intern_settings(json.loads(goals)),
+                gameplay=intern_settings(json.loads(gameplay)),
+                difficulty=intern_settings(json.loads(difficulty))
+            )
+            world.claimed = bool(claimed)
+            game.worlds[world_id] = world
+
+        for guid, player_id, name in players:
+            if guid in restored:
+                game = bot.games[guid]
+                game.players[player_id] = Player(game=game, name=name, player_id=player_id)
+
+        for guid in restored:
+            bot.games.worlds_changed(bot.games[guid])
+        log.info(f'Restored {len(restored)} games from {self.path}')
+        return restored
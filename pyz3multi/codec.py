@@ -0,0 +1,201 @@
+import json
+import re
+from json.decoder import scanstring
+from collections.abc import Mapping
+
+# Pick the fastest JSON library that's installed.  orjson returns bytes from
+# dumps, so it's decoded to keep text frames on the wire.
+try:
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    loads = orjson.loads
+    name = 'orjson'
+except ImportError:
+    try:
+        import ujson
+
+        def dumps(obj):
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+
+        loads = ujson.loads
+        name = 'ujson'
+    except ImportError:
+        def dumps(obj):
+            return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+        loads = json.loads
+        name = 'json'
+
+class LazyDump():
+    """Defers encoding a payload until a log record actually formats it.
+
+    An already encoded frame (a str, bytes or LazyPayload) is logged as it
+    is rather than encoded again.  ``redact`` names top-level keys whose values are masked and ``truncate``
+    caps the length of the text; both are set by ``logs.setup_logging``.
+    """
+    __slots__ = ('obj',)
+
+    redact = frozenset()
+    truncate = None
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        obj = self.obj
+        if isinstance(obj, LazyPayload):
+            obj = obj.frame
+        if isinstance(obj, bytes):
+            obj = obj.decode('utf-8', 'replace')
+        if isinstance(obj, str):
+            # an already encoded frame: mask it in place, don't re-encode it
+            text = _redact(obj, self.redact) if self.redact else obj
+        else:
+            if isinstance(obj, dict) and self.redact and not self.redact.isdisjoint(obj):
+                obj = {key: '<redacted>' if key in self.redact else value for key, value in obj.items()}
+            text = dumps(obj)
+        if self.truncate is not None and len(text) > self.truncate:
+            text = f'{text[:self.truncate]}... ({len(text)} chars)'
+        return text
+
+_SCALAR = re.compile(r'[^,}\]\s]+')
+_NESTED = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]', re.S)
+_SPACE = re.compile(r'\s*')
+
+def _string_end(text, i):
+    """Return the index just past the JSON string starting at ``text[i]``."""
+    end = text.find('"', i + 1)
+    if end < 0:
+        raise ValueError('Unterminated JSON string')
+    if text.find('\\', i + 1, end) < 0:
+        return end + 1
+    # escapes in the way, let the C scanner find the real end
+    return scanstring(text, i + 1)[1]
+
+def _skip(text, i):
+    """Return the index just past the JSON value starting at ``text[i]``."""
+    c = text[i]
+    if c == '"':
+        return _string_end(text, i)
+    if c in '{[':
+        depth = 0
+        for match in _NESTED.finditer(text, i):
+            token = match.group()
+            if token in '{[':
+                depth += 1
+            elif token in '}]':
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+        raise ValueError('Unterminated JSON value')
+    return _SCALAR.match(text, i).end()
+
+def _fields(frame, shallow=False):
+    """Yield ``(key, start, end)`` for each top-level member of a JSON object.
+
+    ``frame[start:end]`` is the member's value, still encoded.  With
+    ``shallow`` the scan stops at the first object or array value, yielding
+    its key with ``end`` set to None.  Raises ValueError if ``frame`` isn't
+    a JSON object.
+    """
+    try:
+        i = _SPACE.match(frame, 0).end()
+        if frame[i] != '{':
+            raise ValueError('Not a JSON object')
+        i = _SPACE.match(frame, i + 1).end()
+        while frame[i] != '}':
+            end = _string_end(frame, i)
+            key = frame[i + 1:end - 1]
+            if '\\' in key:
+                key = json.loads(frame[i:end])
+            i = _SPACE.match(frame, end).end() + 1
+            i = _SPACE.match(frame, i).end()
+            if shallow and frame[i] in '{[':
+                yield key, i, None
+                return
+            end = _skip(frame, i)
+            yield key, i, end
+            i = _SPACE.match(frame, end).end()
+            if frame[i] == ',':
+                i = _SPACE.match(frame, i + 1).end()
+    except (IndexError, AttributeError) as e:
+        raise ValueError('Malformed JSON object') from e
+
+def _redact(frame, keys):
+    """Mask ``keys`` in an encoded JSON object without decoding it.
+
+    Keys are found with a plain substring search, so nested members with
+    the same name are masked as well.  Quotes inside strings are escaped,
+    so text in a string value can't pass for a key.
+    """
+    for key in keys:
+        needle = f'"{key}"'
+        i = frame.find(needle)
+        while i >= 0:
+            j = _SPACE.match(frame, i + len(needle)).end()
+            if not frame.startswith(':', j):
+                i = frame.find(needle, j)
+                continue
+            start = _SPACE.match(frame, j + 1).end()
+            try:
+                end = _skip(frame, start)
+            except (ValueError, IndexError, AttributeError):
+                # can't tell where the value ends, so show none of it
+                return '<redacted>'
+            frame = f'{frame[:start]}"<redacted>"{frame[end:]}'
+            i = frame.find(needle, start)
+    return frame
+
+class LazyPayload(Mapping):
+    """A read-only view of a JSON object frame that decodes members on demand.
+
+    The scalar members in front of the first nested object or array (where
+    the server puts ``type``, ``game``, ``world`` and friends) are located
+    with a cheap scan and decoded one at a time as they're looked up.
+    Anything else decodes the whole frame once.  Pure-Python scanning of
+    nested values is slower than the C decoders, so they're never skipped
+    over by hand.  Raises ValueError if ``frame`` isn't a JSON object.
+    """
+    __slots__ = ('frame', '_spans', '_complete', '_decoded')
+
+    def __init__(self, frame):
+        if isinstance(frame, (bytes, bytearray)):
+            frame = frame.decode('utf-8')
+        self.frame = frame
+        self._spans = {}
+        self._complete = True
+        self._decoded = None
+        for key, start, end in _fields(frame, shallow=True):
+            if end is None:
+                self._complete = False
+                break
+            self._spans[key] = (start, end)
+
+    @property
+    def decoded(self):
+        """The whole payload as a plain dict, decoded the first time it's needed."""
+        if self._decoded is None:
+            self._decoded = loads(self.frame)
+        return self._decoded
+
+    def __getitem__(self, key):
+        if self._decoded is not None:
+            return self._decoded[key]
+        span = self._spans.get(key)
+        if span is None:
+            if self._complete:
+                raise KeyError(key)
+            return self.decoded[key]
+        return loads(self.frame[span[0]:span[1]])
+
+    def __contains__(self, key):
+        return key in self._spans or (not self._complete and key in self.decoded)
+
+    def __iter__(self):
+        return iter(self._spans if self._complete else self.decoded)
+
+    def __len__(self):
+        return len(self._spans if self._complete else self.decoded)
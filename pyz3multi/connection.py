@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+
+import websockets
+
+from pyz3multi.exceptions import ConnectionLimitReached
+
+log = logging.getLogger(__name__)
+
+class ConnectionManager():
+    """Owns every websocket a bot opens.
+
+    The multiworld service has a separate endpoint per game, so sockets can't
+    be shared between rooms.  Instead the manager caps how many sockets are
+    open against each host and only keeps a game's socket open while
+    something is subscribed to it.  Sockets opened for a one-off send on an
+    unsubscribed client are closed again once they've been idle for
+    ``idle_timeout`` seconds.
+
+    ``max_per_host`` counts Game sockets only; the lobby's socket always
+    gets through.  Once a host is at the cap, opening another socket waits
+    up to ``slot_timeout`` seconds for one to close (forever if it's None)
+    and then raises ConnectionLimitReached, so subscribing to or sending on
+    one game too many fails rather than hanging.
+    """
+
+    def __init__(self, max_per_host=100, idle_timeout=60, slot_timeout=10):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.slot_timeout = slot_timeout
+        self._limits = {}
+        # client -> the semaphore it holds a slot in
+        self._slots = {}
+        self._open = {}
+        self._subscriptions = {}
+        self._reaper = None
+
+    def _limit(self, host):
+        try:
+            return self._limits[host]
+        except KeyError:
+            limit = self._limits[host] = asyncio.Semaphore(self.max_per_host)
+            return limit
+
+    @property
+    def open_count(self):
+        return len(self._open)
+
+    def is_subscribed(self, client):
+        return bool(self._subscriptions.get(client))
+
+    def touch(self, client):
+        if client in self._open:
+            self._open[client] = time.monotonic()
+
+    async def _acquire(self, client):
+        limit = self._limit(client.base_address)
+        if not limit.locked() or self.slot_timeout is None:
+            await limit.acquire()
+        else:
+            try:
+                await asyncio.wait_for(limit.acquire(), self.slot_timeout)
+            except asyncio.TimeoutError:
+                raise ConnectionLimitReached(
+                    f'No free connection to {client.base_address} for {client.endpoint}: '
+                    f'all {self.max_per_host} are in use'
+                ) from None
+        self._slots[client] = limit
+
+    def _release(self, client):
+        limit = self._slots.pop(client, None)
+        if limit is not None:
+            limit.release()
+
+    async def open(self, client):
+        """Open a socket for ``client``, waiting for a free slot on its host if it needs one."""
+        if client in self._open:
+            await self.close(client)
+
+        if client.limited:
+            await self._acquire(client)
+        try:
+            socket = await websockets.connect(
+                f"{client.base_address}/{client.endpoint}",
+                ping_timeout=None,
+                ping_interval=None,
+                compression='deflate'
+            )
+        except Exception:
+            self._release(client)
+            raise
+
+        self._open[client] = time.monotonic()
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+        return socket
+
+    async def close(self, client):
+        socket = client.socket
+        self._open.pop(client, None)
+        self._release(client)
+        if socket is not None and not socket.closed:
+            await socket.close()
+
+    async def subscribe(self, client, subscriber=None):
+        subscribers = self._subscriptions.setdefault(client, set())
+        subscribers.add(subscriber)
+        if client.socket is None:
+            try:
+                await client.connect()
+            except ConnectionLimitReached:
+                await self.unsubscribe(client, subscriber)
+                raise
+            if client.socket is None:
+                client.bot.reconnects.schedule(client)
+
+    async def unsubscribe(self, client, subscriber=None):
+        subscribers = self._subscriptions.get(client)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscriptions[client]
+            if client.socket is not None:
+                await client.disconnect()
+
+    async def forget(self, client):
+        self._subscriptions.pop(client, None)
+        if client.socket is not None:
+            await client.disconnect()
+
+    async def close_all(self):
+        self._subscriptions.clear()
+        clients = [c for c in list(self._open) if c.socket is not None]
+        await asyncio.gather(*[c.disconnect() for c in clients], return_exceptions=True)
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+
+    async def _reap(self):
+        while self._open:
+            await asyncio.sleep(self.idle_timeout / 2)
+            cutoff = time.monotonic() - self.idle_timeout
+            idle = [
+                client for client, last_used in self._open.items()
+                if last_used < cutoff and not self.is_subscribed(client)
+            ]
+            for client in idle:
+                log.debug(f"Closing idle connection to {client.endpoint}")
+                try:
+                    await client.disconnect()
+                except Exception:
+                    log.warning(f"Failed to close idle connection to {client.endpoint}", exc_info=True)
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+
+log = logging.getLogger(__name__)
+
+class Dispatcher():
+    """Bounded, ordered hand-off between a client's socket reader and its handlers.
+
+    Frames are queued in arrival order and consumed by a fixed pool of
+    workers.  Once ``high_water`` frames are waiting, ``put`` blocks, which
+    stops the reader from pulling more off the socket until the handlers
+    catch up.  With the default single worker, handlers run strictly in
+    order.
+    """
+
+    def __init__(self, handler, high_water=1000, workers=1):
+        self.handler = handler
+        self.high_water = high_water
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=high_water)
+        self._tasks = []
+
+    @property
+    def running(self):
+        return any(not task.done() for task in self._tasks)
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    def start(self):
+        if self.running:
+            return
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def put(self, payload):
+        await self.queue.put(payload)
+
+    async def drain(self):
+        await self.queue.join()
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+
+    async def _work(self):
+        while True:
+            payload = await self.queue.get()
+            try:
+                await self.handler(payload)
+            except Exception:
+                log.error("A problem occurred while handling a payload.", exc_info=True)
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,85 @@
+import inspect
+import logging
+
+from pyz3multi.types import GameMode, MessageType
+
+log = logging.getLogger(__name__)
+
+def _value(value):
+    return value.value if isinstance(value, (MessageType, GameMode)) else value
+
+class Listener():
+    __slots__ = ('func', 'game', 'mode')
+
+    def __init__(self, func, game=None, mode=None):
+        self.func = func
+        # accept a Game as well as its GUID
+        self.game = getattr(game, 'game', game)
+        self.mode = _value(mode)
+
+    def matches(self, client, payload=None):
+        """Check the filters against a client, and the payload when there is one.
+
+        Game clients are matched on their own GUID and mode.  Lobby frames
+        describe other games, so they're matched on the payload's fields;
+        without a payload they can't be ruled out.
+        """
+        game = getattr(client, 'game', None)
+        if game is not None:
+            return (self.game is None or self.game == game) and (self.mode is None or self.mode == client.mode)
+        if payload is None:
+            return True
+        entry = payload.get('game')
+        if isinstance(entry, dict):
+            # RoomReady nests the lobby entry
+            payload = entry
+            entry = entry.get('game')
+        return (self.game is None or self.game == entry) and (self.mode is None or self.mode == payload.get('mode'))
+
+class EventRouter():
+    """Routes incoming payloads to listeners registered per MessageType.
+
+    Listeners are kept in a table keyed by MessageType value, so finding
+    who's interested in a frame is one dict lookup plus the listeners'
+    filters.  ``wants`` lets the reader skip decoding and dispatching
+    frames that neither the client itself nor any listener cares about.
+    """
+
+    def __init__(self):
+        self._routes = {}
+
+    def on(self, message_type, game=None, mode=None):
+        """Decorator registering ``func(client, payload)`` for ``message_type``."""
+        def decorator(func):
+            self.add(func, message_type, game=game, mode=mode)
+            return func
+        return decorator
+
+    def add(self, func, message_type, game=None, mode=None):
+        key = _value(message_type)
+        self._routes[key] = self._routes.get(key, ()) + (Listener(func, game, mode),)
+
+    def remove(self, func, message_type=None):
+        keys = [_value(message_type)] if message_type is not None else list(self._routes)
+        for key in keys:
+            listeners = tuple(l for l in self._routes.get(key, ()) if l.func is not func)
+            if listeners:
+                self._routes[key] = listeners
+            else:
+                self._routes.pop(key, None)
+
+    def wants(self, client, message_type):
+        if not client.filter_frames or message_type in client.handlers:
+            return True
+        return any(listener.matches(client) for listener in self._routes.get(message_type, ()))
+
+    async def emit(self, client, payload):
+        for listener in self._routes.get(payload.get('type'), ()):
+            if not listener.matches(client, payload):
+                continue
+            try:
+                result = listener.func(client, payload)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                log.error(f'Listener {listener.func!r} failed', exc_info=True)
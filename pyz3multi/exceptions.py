@@ -0,0 +1,8 @@
+class pyz3multiException(Exception):
+    pass
+
+class PendingRequestEvicted(pyz3multiException):
+    pass
+
+class ConnectionLimitReached(pyz3multiException):
+    pass
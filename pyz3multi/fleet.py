@@ -0,0 +1,321 @@
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import os
+
+from pyz3multi import codec
+from pyz3multi.bot import MultiworldBot
+from pyz3multi.exceptions import pyz3multiException
+from pyz3multi.pending import PendingRequests
+from pyz3multi.types import MessageType
+from pyz3multi.websocket import Lobby
+
+log = logging.getLogger(__name__)
+
+class HashRing():
+    """Consistent hashing of game GUIDs onto shard indexes."""
+
+    def __init__(self, shards, replicas=64):
+        self.shards = shards
+        ring = sorted(
+            (self._hash(f'{shard}:{replica}'), shard)
+            for shard in range(shards)
+            for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in ring]
+        self._shards = [shard for _, shard in ring]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+    def owner(self, guid):
+        i = bisect.bisect(self._keys, self._hash(guid)) % len(self._keys)
+        return self._shards[i]
+
+class ShardWorker():
+    """Runs inside a shard process and owns the Game connections hashed to it.
+
+    The shard's bot never connects its own lobby; the parent forwards the
+    lobby events for this shard's games and sends commands over ``conn``.
+    The worlds, claims and players the shard hears about are sent back, so
+    the parent's registry stays complete.
+    """
+
+    # handled here, then passed on to the parent's copy of the game
+    FORWARDED = (MessageType.WorldDescription, MessageType.WorldClaim, MessageType.Identify)
+
+    def __init__(self, index, conn, bot):
+        self.index = index
+        self.conn = conn
+        self.bot = bot
+        self._stopped = None
+        for message_type in self.FORWARDED:
+            bot.events.add(self.forward, message_type)
+
+    def forward(self, game, payload):
+        if isinstance(payload, codec.LazyPayload):
+            # the frame is all the parent needs, it can decode it lazily too
+            payload = payload.frame
+        self.conn.send(('update', game.game, payload))
+
+    async def run(self):
+        loop = asyncio.get_event_loop()
+        self._stopped = loop.create_future()
+        loop.add_reader(self.conn.fileno(), self._on_readable)
+        try:
+            await self._stopped
+        finally:
+            loop.remove_reader(self.conn.fileno())
+            await self.bot.close()
+
+    def _on_readable(self):
+        try:
+            while self.conn.poll():
+                message = self.conn.recv()
+                asyncio.create_task(self.handle(*message))
+        except (EOFError, OSError):
+            # the parent went away
+            if not self._stopped.done():
+                self._stopped.set_result(None)
+
+    async def handle(self, kind, *args):
+        if kind == 'lobby_entry':
+            await self.bot.lobby.on_lobby_entry(args[0])
+        elif kind == 'stop':
+            if not self._stopped.done():
+                self._stopped.set_result(None)
+        elif kind == 'call':
+            request_id, command, guid, params = args
+            try:
+                result = await self.call(command, guid, params)
+            except Exception as e:
+                log.error(f'Shard {self.index} failed to run {command} for {guid}', exc_info=True)
+                self.conn.send(('result', request_id, False, repr(e)))
+            else:
+                self.conn.send(('result', request_id, True, result))
+
+    async def call(self, command, guid, params):
+        game = self.bot.get_game(guid)
+        if game is None:
+            raise pyz3multiException(f'Shard {self.index} does not know game {guid}')
+
+        if command == 'subscribe':
+            await self.bot.subscribe(game, params.get('subscriber'))
+        elif command == 'unsubscribe':
+            await self.bot.unsubscribe(game, params.get('subscriber'))
+        elif command == 'claim':
+            world = game.get_world(params['world'])
+            if world is None:
+                raise pyz3multiException(f'Game {guid} has no world {params["world"]}')
+            await (world.claim() if params.get('claim', True) else world.unclaim())
+        elif command == 'destroy':
+            await game.destroy(save=params.get('save', False))
+        elif command == 'chat':
+            await game.chat(params['body'])
+        elif command == 'kick':
+            player = game.get_player(params['player'])
+            if player is None:
+                raise pyz3multiException(f'Game {guid} has no player {params["player"]}')
+            await player.kick(reason=params['reason'], resolution=params['resolution'])
+        elif command == 'import_records':
+            await game.import_records(params['body'], **params.get('kwargs', {}))
+        elif command == 'worlds':
+            return {world_id: world.claimed for world_id, world in game.worlds.items()}
+        else:
+            raise pyz3multiException(f'Unknown shard command {command}')
+
+# MultiworldBot options that only make sense in the parent: it owns the
+# registry, so it's the one that snapshots it
+PARENT_ONLY = ('state_path', 'state_interval', 'reconcile_delay')
+
+def shard_path(path, index):
+    """``path`` with ``-shard<index>`` before its suffix, keeping any .gz/.zst."""
+    root, ext = os.path.splitext(os.fspath(path))
+    if ext in ('.gz', '.zst'):
+        root, inner = os.path.splitext(root)
+        ext = inner + ext
+    return f'{root}-shard{index}{ext}'
+
+def run_shard(index, conn, token, name, bot_kwargs):
+    bot = MultiworldBot(token, name, **bot_kwargs)
+    asyncio.run(ShardWorker(index, conn, bot).run())
+
+class FleetLobby(Lobby):
+    """Keeps the parent's registry current and forwards each entry to its shard."""
+
+    __slots__ = ()
+
+    async def on_lobby_entry(self, payload):
+        await super().on_lobby_entry(payload)
+        self.bot.route(payload)
+
+    async def on_room_ready(self, payload):
+        if 'game' in payload:
+            self.bot.route(payload['game'])
+        await super().on_room_ready(payload)
+
+class FleetBot(MultiworldBot):
+    """A MultiworldBot that spreads its Game connections over worker processes.
+
+    The parent process owns the lobby socket and the game registry.  Every
+    game GUID is consistently hashed onto one of ``shards`` processes, which
+    holds that game's socket and handles its traffic, and reports the
+    worlds, claims and players it sees back to the parent's registry.
+    Commands for a game (``claim``, ``destroy``, ``chat``, ...), including
+    the bulk ``*_many`` helpers, are sent to the owning shard and return
+    once the shard has run them.
+
+    Shard pipes are watched with ``loop.add_reader``, so this needs a
+    selector-based event loop (i.e. not the Windows proactor loop).
+    """
+
+    lobby_class = FleetLobby
+
+    def __init__(self, token, name, shards=None, **kwargs):
+        super().__init__(token, name, **kwargs)
+        self.shards = shards or os.cpu_count() or 1
+        self.ring = HashRing(self.shards)
+        self.results = PendingRequests(timeout=self.request_timeout)
+        self._bot_kwargs = {key: value for key, value in kwargs.items() if key not in PARENT_ONLY}
+        self._processes = []
+        self._conns = []
+        self._ids = itertools.count()
+
+    def shard_for(self, guid):
+        return self.ring.owner(guid)
+
+    def shard_kwargs(self, index):
+        """The MultiworldBot arguments for shard ``index``.
+
+        Shards don't get the state cache, and each records to its own file
+        next to the parent's rather than truncating it.
+        """
+        kwargs = dict(self._bot_kwargs)
+        if kwargs.get('record_path') is not None:
+            kwargs['record_path'] = shard_path(kwargs['record_path'], index)
+        return kwargs
+
+    async def start(self):
+        ctx = multiprocessing.get_context('spawn')
+        loop = asyncio.get_event_loop()
+        for index in range(self.shards):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=run_shard,
+                args=(index, child_conn, self.token, self.name, self.shard_kwargs(index)),
+                name=f'pyz3multi-shard-{index}',
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            loop.add_reader(parent_conn.fileno(), self._on_readable, parent_conn)
+            self._processes.append(process)
+            self._conns.append(parent_conn)
+        await super().start()
+
+    def _on_readable(self, conn):
+        try:
+            while conn.poll():
+                message = conn.recv()
+                if message[0] == 'update':
+                    asyncio.create_task(self.update(*message[1:]))
+                    continue
+                kind, request_id, ok, value = message
+                if ok:
+                    self.results.resolve(request_id, value)
+                else:
+                    self.results.reject(request_id, pyz3multiException(value))
+        except (EOFError, OSError):
+            log.error('Lost the connection to a shard process')
+            asyncio.get_event_loop().remove_reader(conn.fileno())
+
+    async def update(self, guid, payload):
+        """Apply a world, claim or player update a shard saw to the parent's Game."""
+        game = self.get_game(guid)
+        if game is None:
+            return
+        if isinstance(payload, str):
+            payload = codec.LazyPayload(payload)
+        await getattr(game, game.handlers[payload['type']])(payload)
+
+    def route(self, payload):
+        if not self._conns:
+            return
+        self._conns[self.shard_for(payload['game'])].send(('lobby_entry', payload))
+
+    async def call(self, guid, command, **params):
+        request_id = next(self._ids)
+        future = self.results.register(request_id)
+        self._conns[self.shard_for(guid)].send(('call', request_id, command, guid, params))
+        return await future
+
+    async def subscribe(self, game, subscriber=None):
+        await self.call(game.game, 'subscribe', subscriber=subscriber)
+
+    async def unsubscribe(self, game, subscriber=None):
+        await self.call(game.game, 'unsubscribe', subscriber=subscriber)
+
+    async def create(self, **kwargs):
+        game = await (await self.lobby.create(**kwargs))
+        return game.game
+
+    async def destroy(self, guid, save=False):
+        await self.call(guid, 'destroy', save=save)
+
+    async def claim(self, guid, world, claim=True):
+        await self.call(guid, 'claim', world=world, claim=claim)
+
+    async def chat(self, guid, body):
+        await self.call(guid, 'chat', body=body)
+
+    async def kick(self, guid, player, reason, resolution):
+        await self.call(guid, 'kick', player=player, reason=reason, resolution=resolution)
+
+    async def import_records(self, guid, body, **kwargs):
+        await self.call(guid, 'import_records', body=body, kwargs=kwargs)
+
+    async def worlds(self, guid):
+        return await self.call(guid, 'worlds')
+
+    # the bulk helpers go through the owning shards too, rather than opening
+    # sockets for the parent's Game objects; create_many only needs the lobby
+
+    def destroy_many(self, games, save=False):
+        return self.bulk.run(games, lambda game: self.destroy(game.game, save=save), lambda game: game.endpoint)
+
+    def claim_many(self, worlds, claim=True):
+        return self.bulk.run(
+            worlds,
+            lambda world: self.claim(world.game.game, world.world, claim=claim),
+            lambda world: world.game.endpoint
+        )
+
+    def kick_many(self, players, reason, resolution):
+        return self.bulk.run(
+            players,
+            lambda player: self.kick(player.game.game, player.player_id, reason, resolution),
+            lambda player: player.game.endpoint
+        )
+
+    async def close(self):
+        await super().close()
+        loop = asyncio.get_event_loop()
+        for conn in self._conns:
+            loop.remove_reader(conn.fileno())
+            try:
+                conn.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, self.flush_timeout + 1)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        self.results.cancel_all()
+        self._processes = []
+        self._conns = []
@@ -0,0 +1,230 @@
+import time
+
+from pyz3multi.types import MessageType
+
+NO_ITEM = 0xFFFF
+
+def _grow(table, index, fill=0):
+    if index >= len(table):
+        table.extend(bytes([fill]) * (index + 1 - len(table)))
+
+def _set_bit(bits, index):
+    _grow(bits, index >> 3)
+    bits[index >> 3] |= 1 << (index & 7)
+
+def _has_bit(bits, index):
+    byte = index >> 3
+    return byte < len(bits) and bool(bits[byte] & (1 << (index & 7)))
+
+def _bits(bits):
+    return [
+        (byte << 3) + bit
+        for byte, value in enumerate(bits) if value
+        for bit in range(8) if value & (1 << bit)
+    ]
+
+class PlayerProgress():
+    __slots__ = (
+        'sender', 'world', 'items', 'checks', 'requests', 'deaths', 'save_quits',
+        'dungeons', 'area', 'finished', 'updated'
+    )
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.world = None
+        self.items = 0
+        self.checks = 0
+        self.requests = 0
+        self.deaths = 0
+        self.save_quits = 0
+        self.dungeons = 0
+        self.area = None
+        self.finished = None
+        self.updated = None
+
+    def snapshot(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+class WorldState():
+    """Items, locations and dungeons for one world, in flat byte tables.
+
+    ``items`` counts how many of each item id the world has, ``placed`` maps
+    location ids to the item filled there (two bytes per location), and
+    ``checked``/``dungeons`` are bitsets.  Tables grow to fit the largest id
+    seen, so every update is a couple of indexed writes.
+    """
+    __slots__ = ('world', 'items', 'placed', 'checked', 'dungeons', 'checks', 'deaths', 'finished')
+
+    def __init__(self, world):
+        self.world = world
+        self.items = bytearray()
+        self.placed = bytearray()
+        self.checked = bytearray()
+        self.dungeons = bytearray()
+        self.checks = 0
+        self.deaths = 0
+        self.finished = None
+
+    def fill(self, location, item):
+        _grow(self.placed, location * 2 + 1, 0xFF)
+        self.placed[location * 2] = item & 0xFF
+        self.placed[location * 2 + 1] = item >> 8
+
+    def placed_item(self, location):
+        if location * 2 + 1 >= len(self.placed):
+            return None
+        item = self.placed[location * 2] | self.placed[location * 2 + 1] << 8
+        return None if item == NO_ITEM else item
+
+    def acquire(self, item):
+        _grow(self.items, item)
+        if self.items[item] < 0xFF:
+            self.items[item] += 1
+
+    def item_count(self, item):
+        return self.items[item] if item < len(self.items) else 0
+
+    def check(self, location):
+        """Mark ``location`` checked, returning False if it already was."""
+        if _has_bit(self.checked, location):
+            return False
+        _set_bit(self.checked, location)
+        self.checks += 1
+        return True
+
+    def is_checked(self, location):
+        return _has_bit(self.checked, location)
+
+    def finish_dungeon(self, dungeon):
+        if _has_bit(self.dungeons, dungeon):
+            return False
+        _set_bit(self.dungeons, dungeon)
+        return True
+
+    def snapshot(self):
+        return {
+            'world': self.world,
+            'items': {item: count for item, count in enumerate(self.items) if count},
+            'checked': _bits(self.checked),
+            'dungeons': _bits(self.dungeons),
+            'checks': self.checks,
+            'deaths': self.deaths,
+            'finished': self.finished,
+        }
+
+class GameState():
+    """Incrementally tracks a room's gameplay events.
+
+    Feed it payloads with ``apply``; each event type updates a WorldState
+    and the sending player's PlayerProgress in constant time.  Events are
+    read from their ``world``, ``location``, ``item``, ``area`` and
+    ``dungeon`` fields, falling back to the sender's last known world.
+    """
+
+    # maps a MessageType value to the method that applies it
+    events = {
+        MessageType.ItemFill.value: 'item_fill',
+        MessageType.DungeonFill.value: 'item_fill',
+        MessageType.EquipmentFill.value: 'item_fill',
+        MessageType.RequestItem.value: 'request_item',
+        MessageType.AcquireItem.value: 'acquire_item',
+        MessageType.EnterArea.value: 'enter_area',
+        MessageType.FinishDungeon.value: 'finish_dungeon',
+        MessageType.Death.value: 'death',
+        MessageType.SaveQuit.value: 'save_quit',
+        MessageType.Finish.value: 'finish',
+    }
+
+    def __init__(self):
+        self.worlds = {}
+        self.players = {}
+        self.events_applied = 0
+        self.updated = None
+
+    def apply(self, payload):
+        """Apply one event; returns False for payloads that aren't gameplay events."""
+        method = self.events.get(payload.get('type'))
+        if method is None:
+            return False
+        # fills come from the service, not from a player
+        player = self.player(payload['sender']) if payload.get('sender') is not None else None
+        world = payload.get('world')
+        if player is not None:
+            if world is None:
+                world = player.world
+            else:
+                player.world = world
+        if world is None:
+            return False
+        self.updated = time.time()
+        if player is not None:
+            player.updated = self.updated
+        self.events_applied += 1
+        getattr(self, method)(payload, self.world(world), player)
+        return True
+
+    def world(self, world):
+        state = self.worlds.get(world)
+        if state is None:
+            state = self.worlds[world] = WorldState(world)
+        return state
+
+    def player(self, sender):
+        progress = self.players.get(sender)
+        if progress is None:
+            progress = self.players[sender] = PlayerProgress(sender)
+        return progress
+
+    def item_fill(self, payload, world, player):
+        world.fill(payload['location'], payload['item'])
+
+    # player is None for events the service sent on nobody's behalf
+
+    def request_item(self, payload, world, player):
+        if player is not None:
+            player.requests += 1
+
+    def acquire_item(self, payload, world, player):
+        if payload.get('item') is not None:
+            world.acquire(payload['item'])
+            if player is not None:
+                player.items += 1
+        if payload.get('location') is not None and world.check(payload['location']) and player is not None:
+            player.checks += 1
+
+    def enter_area(self, payload, world, player):
+        if player is not None:
+            player.area = payload.get('area')
+
+    def finish_dungeon(self, payload, world, player):
+        if world.finish_dungeon(payload['dungeon']) and player is not None:
+            player.dungeons += 1
+
+    def death(self, payload, world, player):
+        world.deaths += 1
+        if player is not None:
+            player.deaths += 1
+
+    def save_quit(self, payload, world, player):
+        if player is not None:
+            player.save_quits += 1
+
+    def finish(self, payload, world, player):
+        world.finished = payload.get('created', self.updated)
+        if player is not None:
+            player.finished = world.finished
+
+    def standings(self):
+        """Players ordered by who finished first, then by locations checked."""
+        return sorted(
+            self.players.values(),
+            key=lambda p: (p.finished is None, p.finished or 0, -p.checks)
+        )
+
+    def snapshot(self):
+        return {
+            'events': self.events_applied,
+            'updated': self.updated,
+            'worlds': {world: state.snapshot() for world, state in self.worlds.items()},
+            'players': {sender: progress.snapshot() for sender, progress in self.players.items()},
+        }
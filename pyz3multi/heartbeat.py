@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import time
+
+from pyz3multi.metrics import Histogram
+
+log = logging.getLogger(__name__)
+
+class Heartbeat():
+    """Pings a client's socket and measures the round trip.
+
+    Every ``interval`` seconds a websocket ping is sent; if the pong doesn't
+    come back within ``timeout`` seconds the connection is marked stale and
+    aborted, which makes the listener hand it to the reconnect scheduler
+    straight away instead of waiting for a send to fail.
+    """
+
+    def __init__(self, client, interval=20, timeout=10):
+        self.client = client
+        self.interval = interval
+        self.timeout = timeout
+        self.rtt = Histogram()
+        self.last_rtt = None
+        self.last_pong = None
+        self.stale = False
+        self.failures = 0
+        self._task = None
+
+    @property
+    def enabled(self):
+        return bool(self.interval)
+
+    def start(self):
+        self.stop()
+        self.stale = False
+        if self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            socket = self.client.socket
+            if socket is None or not socket.open:
+                continue
+
+            sent = time.perf_counter()
+            try:
+                pong = await socket.ping()
+                await asyncio.wait_for(pong, self.timeout)
+            except asyncio.TimeoutError:
+                self.stale = True
+                self.failures += 1
+                log.warning(f'No pong from {self.client.endpoint} within {self.timeout} seconds, reconnecting')
+                transport = getattr(socket, 'transport', None)
+                if transport is not None:
+                    transport.abort()
+                return
+            except Exception:
+                # the listener will notice the socket closing
+                return
+
+            self.last_pong = time.monotonic()
+            self.last_rtt = time.perf_counter() - sent
+            self.rtt.observe(self.last_rtt)
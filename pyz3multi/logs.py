@@ -0,0 +1,111 @@
+import logging
+import logging.handlers
+import queue
+import sys
+
+from pyz3multi import codec
+from pyz3multi.ratelimit import TokenBucket
+
+# top-level payload keys masked in logged frames; the bot token rides in
+# 'sender'.  Record bodies are never dumped to the log in the first place.
+REDACT = ('sender', 'password')
+
+class FrameFilter(logging.Filter):
+    """Samples and rate-limits per-frame log records by message type.
+
+    ``sample`` maps a type name (``'Chat'``) or ``'*'`` to N, keeping one
+    record in N.  ``rate`` and ``burst`` cap each type at that many records
+    per second.  Records that aren't about a frame always pass.  ``dropped``
+    counts what was filtered out, by type.
+    """
+
+    def __init__(self, sample=None, rate=None, burst=None):
+        super().__init__()
+        self.sample = sample or {}
+        self.rate = rate
+        self.burst = burst
+        self.dropped = {}
+        self._seen = {}
+        self._buckets = {}
+
+    def filter(self, record):
+        message_type = getattr(record, 'message_type', None)
+        if message_type is None:
+            return True
+        every = self.sample.get(message_type, self.sample.get('*', 1))
+        seen = self._seen[message_type] = self._seen.get(message_type, 0) + 1
+        keep = (seen - 1) % every == 0
+        if keep and self.rate is not None:
+            bucket = self._buckets.get(message_type)
+            if bucket is None:
+                bucket = self._buckets[message_type] = TokenBucket(self.rate, self.burst)
+            keep = bucket.try_acquire()
+        if not keep:
+            self.dropped[message_type] = self.dropped.get(message_type, 0) + 1
+        return keep
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the frame fields as their own keys."""
+
+    FIELDS = ('direction', 'endpoint', 'message_type')
+
+    def format(self, record):
+        entry = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return codec.dumps(entry)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that leaves formatting to the listener thread.
+
+    The stock one renders the message (and so every LazyDump) on the
+    calling thread, which is exactly the work this is meant to keep off the
+    event loop.  Payloads aren't changed once they're logged, so it's safe
+    to format them later.
+    """
+
+    def prepare(self, record):
+        return record
+
+def setup_logging(level=logging.INFO, stream=None, structured=True, sample=None, rate=None, burst=None, redact=REDACT, truncate=2048):
+    """Send all logging through a queue to a background thread.
+
+    Log calls on the event loop only filter and enqueue the record;
+    formatting and I/O happen on the listener's thread.  Per-frame records
+    go through a FrameFilter first (see ``sample``, ``rate`` and ``burst``).
+    Logged payloads have ``redact`` keys masked and are cut to ``truncate``
+    characters.  ``structured`` writes JSON lines instead of plain text.
+    Returns the started QueueListener; stop it on the way out to flush what's
+    left.
+    """
+    output = logging.StreamHandler(sys.stderr if stream is None else stream)
+    if structured:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    records = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(FrameFilter(sample=sample, rate=rate, burst=burst))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    codec.LazyDump.redact = frozenset(redact or ())
+    codec.LazyDump.truncate = truncate
+
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,204 @@
+import asyncio
+import bisect
+import json
+
+from pyz3multi.types import MessageType
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Histogram():
+    """Counts observations into fixed, cumulative-style buckets."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # one extra bucket for everything above the last bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        return {
+            'buckets': dict(zip(self.buckets, self.counts)),
+            'overflow': self.counts[-1],
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+TYPE_NAMES = {message_type.value: message_type.name for message_type in MessageType}
+
+def type_name(message_type):
+    try:
+        return TYPE_NAMES[message_type]
+    except (KeyError, TypeError):
+        return str(message_type)
+
+def frame_extra(direction, endpoint, message_type):
+    """The ``extra`` fields attached to per-frame log records, see pyz3multi.logs."""
+    return {'direction': direction, 'endpoint': endpoint, 'message_type': type_name(message_type)}
+
+class Metrics():
+    """Counters and timings for everything a bot sends and receives.
+
+    Frames and bytes are counted per direction and MessageType, parse and
+    serialize times and per-type handler latency go into histograms.
+    Handler time is also totalled per endpoint so the busiest rooms stand
+    out; only the ``top_endpoints`` busiest are exported.  Gauges such as
+    queue depth are read from the bot when exported.
+    Byte counts are the length of the encoded text, which matches the wire
+    size for the ASCII-only payloads the service sends.
+    """
+
+    def __init__(self, top_endpoints=20):
+        self.top_endpoints = top_endpoints
+        self.endpoints = {}
+        self.frames = {}
+        self.bytes = {}
+        self.parse = Histogram()
+        self.serialize = Histogram()
+        self.handlers = {}
+
+    def frame(self, direction, message_type, size):
+        key = (direction, type_name(message_type))
+        self.frames[key] = self.frames.get(key, 0) + 1
+        self.bytes[key] = self.bytes.get(key, 0) + size
+
+    def handled(self, message_type, seconds, endpoint=None):
+        if endpoint is not None:
+            self.endpoints[endpoint] = self.endpoints.get(endpoint, 0.0) + seconds
+        name = type_name(message_type)
+        try:
+            histogram = self.handlers[name]
+        except KeyError:
+            histogram = self.handlers[name] = Histogram()
+        histogram.observe(seconds)
+
+    def snapshot(self, gauges=None):
+        return {
+            'frames': [
+                {'direction': direction, 'type': name, 'frames': count, 'bytes': self.bytes[(direction, name)]}
+                for (direction, name), count in sorted(self.frames.items())
+            ],
+            'parse_seconds': self.parse.snapshot(),
+            'serialize_seconds': self.serialize.snapshot(),
+            'handler_seconds': {name: histogram.snapshot() for name, histogram in sorted(self.handlers.items())},
+            'busiest_endpoints': dict(self.busiest()),
+            'gauges': gauges or {},
+        }
+
+    def busiest(self):
+        return sorted(self.endpoints.items(), key=lambda item: item[1], reverse=True)[:self.top_endpoints]
+
+    def prometheus(self, gauges=None):
+        lines = [
+            '# TYPE pyz3multi_frames_total counter',
+        ]
+        for (direction, name), count in sorted(self.frames.items()):
+            lines.append(f'pyz3multi_frames_total{{direction="{direction}",type="{name}"}} {count}')
+        lines.append('# TYPE pyz3multi_bytes_total counter')
+        for (direction, name), size in sorted(self.bytes.items()):
+            lines.append(f'pyz3multi_bytes_total{{direction="{direction}",type="{name}"}} {size}')
+
+        lines.extend(_prometheus_histogram('pyz3multi_parse_seconds', self.parse))
+        lines.extend(_prometheus_histogram('pyz3multi_serialize_seconds', self.serialize))
+        lines.append('# TYPE pyz3multi_handler_seconds histogram')
+        for name, histogram in sorted(self.handlers.items()):
+            lines.extend(_prometheus_histogram('pyz3multi_handler_seconds', histogram, f'type="{name}"', header=False))
+
+        lines.append('# TYPE pyz3multi_endpoint_handler_seconds_total counter')
+        for endpoint, seconds in self.busiest():
+            lines.append(f'pyz3multi_endpoint_handler_seconds_total{{endpoint="{endpoint}"}} {seconds}')
+
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f'# TYPE pyz3multi_{name} gauge')
+            lines.append(f'pyz3multi_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+def _prometheus_histogram(name, histogram, labels='', header=True):
+    lines = [f'# TYPE {name} histogram'] if header else []
+    prefix = f'{labels},' if labels else ''
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f'{{{labels}}}' if labels else ''
+    lines.append(f'{name}_sum{suffix} {histogram.sum}')
+    lines.append(f'{name}_count{suffix} {histogram.count}')
+    return lines
+
+class MetricsExporter():
+    """Serves a bot's metrics over HTTP on a local port.
+
+    ``GET /metrics`` returns the Prometheus text format, ``GET /metrics.json``
+    the same data as JSON.
+    """
+
+    def __init__(self, bot, host='127.0.0.1', port=9100):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await reader.readline()
+            # skip the headers, we don't need any of them
+            while (await reader.readline()).strip():
+                pass
+            parts = request.decode('latin-1').split()
+            path = parts[1] if len(parts) > 1 else '/'
+
+            gauges = self.bot.gauges()
+            if path == '/metrics':
+                status, content_type = '200 OK', 'text/plain; version=0.0.4'
+                body = self.bot.metrics.prometheus(gauges)
+            elif path == '/metrics.json':
+                status, content_type = '200 OK', 'application/json'
+                body = json.dumps(self.bot.metrics.snapshot(gauges))
+            else:
+                status, content_type, body = '404 Not Found', 'text/plain', 'Not found\n'
+
+            body = body.encode('utf-8')
+            writer.write(
+                f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
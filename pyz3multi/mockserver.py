@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+
+import websockets
+
+from pyz3multi import codec
+from pyz3multi.types import MessageType, GameMode
+
+log = logging.getLogger(__name__)
+
+class MockRoom():
+    def __init__(self, guid, name, description, password, mode, world_count):
+        self.guid = guid
+        self.name = name
+        self.description = description
+        self.password = password
+        self.mode = mode
+        self.created = int(time.time())
+        self.players = {}
+        self.worlds = {
+            world: {
+                'title': f'World {world}',
+                'description': '',
+                'rng': str(uuid.uuid4()),
+                'claimed': False,
+            }
+            for world in range(1, world_count + 1)
+        }
+        self.sockets = set()
+        self.records = None
+
+    def entry(self, destroyed=False):
+        return {
+            'type': MessageType.LobbyEntry.value,
+            'game': self.guid,
+            'name': self.name,
+            'description': self.description,
+            'hasPassword': bool(self.password),
+            'worldCount': len(self.worlds),
+            'created': self.created,
+            'mode': self.mode,
+            'destroyed': destroyed,
+        }
+
+class MockMultiworldServer():
+    """A local stand-in for the multiworld service, for tests and benchmarks.
+
+    It speaks enough of the protocol for the client to be exercised end to
+    end: lobby listings, Create/RoomReady, Knock/Identify, WorldDescription,
+    WorldClaim, Kick, Destroy, Chat and ImportRecords.  State lives in
+    memory and is lost when the server stops.
+    """
+
+    def __init__(self, host='localhost', port=0, world_count=2):
+        self.host = host
+        self.port = port
+        self.world_count = world_count
+        self.rooms = {}
+        self.lobby_sockets = set()
+        self.received = {}
+        self._server = None
+
+    @property
+    def base_address(self):
+        return f'ws://{self.host}:{self.port}'
+
+    async def start(self):
+        self._server = await websockets.serve(self.handler, self.host, self.port, max_size=None, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info(f'Mock multiworld server listening on {self.base_address}')
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def add_room(self, name='Mock room', description='', password='', mode=GameMode.Multiworld.value, world_count=None):
+        room = MockRoom(
+            guid=str(uuid.uuid4()),
+            name=name,
+            description=description,
+            password=password,
+            mode=mode,
+            world_count=self.world_count if world_count is None else world_count
+        )
+        self.rooms[room.guid] = room
+        return room
+
+    async def drop_connections(self):
+        """Close every client socket, as a service restart would."""
+        sockets = set(self.lobby_sockets)
+        for room in self.rooms.values():
+            sockets |= room.sockets
+        await asyncio.gather(*[ws.close() for ws in sockets], return_exceptions=True)
+
+    async def send(self, ws, payload):
+        payload.setdefault('id', str(uuid.uuid4()))
+        payload.setdefault('created', int(time.time()))
+        try:
+            await ws.send(codec.dumps(payload))
+        except websockets.ConnectionClosed:
+            pass
+
+    def broadcast(self, sockets, payload):
+        payload.setdefault('id', str(uuid.uuid4()))
+        payload.setdefault('created', int(time.time()))
+        websockets.broadcast(sockets, codec.dumps(payload))
+
+    async def handler(self, ws, path=None):
+        path = (ws.path if path is None else path).strip('/')
+        if path == 'api/lobby':
+            await self.serve_lobby(ws)
+        elif path.startswith('api/game/') and path[len('api/game/'):] in self.rooms:
+            await self.serve_game(ws, self.rooms[path[len('api/game/'):]])
+        else:
+            await ws.close(code=4004, reason='Not found')
+
+    async def _messages(self, ws):
+        try:
+            async for data in ws:
+                payload = codec.loads(data)
+                message_type = payload.get('type')
+                self.received[message_type] = self.received.get(message_type, 0) + 1
+                yield payload
+        except websockets.ConnectionClosed:
+            return
+
+    async def serve_lobby(self, ws):
+        self.lobby_sockets.add(ws)
+        try:
+            async for payload in self._messages(ws):
+                message_type = payload['type']
+                if message_type == MessageType.LobbyRequest.value:
+                    for room in list(self.rooms.values()):
+                        await self.send(ws, room.entry())
+                elif message_type == MessageType.Create.value:
+                    room = self.add_room(
+                        name=payload.get('name', ''),
+                        description=payload.get('description', ''),
+                        password=payload.get('password', ''),
+                        mode=payload.get('mode', GameMode.Multiworld.value)
+                    )
+                    await self.send(ws, {
+                        'type': MessageType.RoomReady.value,
+                        'creationToken': payload.get('creationToken'),
+                        'game': room.entry(),
+                    })
+                    self.broadcast(self.lobby_sockets - {ws}, room.entry())
+                elif message_type == MessageType.Chat.value:
+                    self.broadcast(self.lobby_sockets, payload)
+        finally:
+            self.lobby_sockets.discard(ws)
+
+    async def serve_game(self, ws, room):
+        room.sockets.add(ws)
+        player = None
+        try:
+            async for payload in self._messages(ws):
+                message_type = payload['type']
+                if message_type == MessageType.Knock.value:
+                    if room.password and payload.get('password') != room.password:
+                        await ws.close(code=4003, reason='Bad password')
+                        return
+                    player = payload.get('sender') or str(uuid.uuid4())
+                    room.players[player] = payload.get('playerName', '')
+                    self.broadcast(room.sockets, {
+                        'type': MessageType.Identify.value,
+                        'sender': player,
+                        'name': room.players[player],
+                    })
+                    for sender, name in room.players.items():
+                        if sender != player:
+                            await self.send(ws, {'type': MessageType.Identify.value, 'sender': sender, 'name': name})
+                    for world, description in room.worlds.items():
+                        await self.send(ws, {
+                            'type': MessageType.WorldDescription.value,
+                            'world': world,
+                            'title': description['title'],
+                            'description': description['description'],
+                            'rng': description['rng'],
+                        })
+                        if description['claimed']:
+                            await self.send(ws, {'type': MessageType.WorldClaim.value, 'world': world, 'claim': True})
+                elif message_type == MessageType.WorldClaim.value:
+                    world = room.worlds.get(payload.get('world'))
+                    if world is not None:
+                        world['claimed'] = bool(payload.get('claim'))
+                        self.broadcast(room.sockets, payload)
+                elif message_type == MessageType.ImportRecords.value:
+                    room.records = payload.get('body')
+                    self.broadcast(room.sockets, {'type': MessageType.ImportRecords.value, 'importType': payload.get('importType')})
+                elif message_type == MessageType.Kick.value:
+                    room.players.pop(payload.get('target'), None)
+                    self.broadcast(room.sockets, payload)
+                elif message_type == MessageType.Destroy.value:
+                    self.rooms.pop(room.guid, None)
+                    self.broadcast(self.lobby_sockets, room.entry(destroyed=True))
+                    await asyncio.gather(*[s.close() for s in set(room.sockets)], return_exceptions=True)
+                    return
+                elif message_type == MessageType.Chat.value:
+                    self.broadcast(room.sockets, payload)
+        finally:
+            room.sockets.discard(ws)
+
+async def serve_forever(host, port, rooms):
+    server = MockMultiworldServer(host, port)
+    for i in range(rooms):
+        server.add_room(name=f'Mock room {i}')
+    await server.start()
+    print(f'Listening on {server.base_address}')
+    await asyncio.Future()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a local mock multiworld service.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rooms', type=int, default=0, help='rooms to create at startup')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve_forever(args.host, args.port, args.rooms))
@@ -0,0 +1,73 @@
+"""Fire-and-forget commands for short-lived processes.
+
+Each command opens only the socket it needs, sends one payload, waits for
+it to be written and closes the bot.  The bot is made with ``listen=False``
+and ``lobby_snapshot=False``, so nothing reads the sockets and the lobby
+never asks for the room list.  ``python -m pyz3multi <command>`` runs these.
+"""
+import asyncio
+import uuid
+
+from pyz3multi.bot import MultiworldBot
+from pyz3multi.exceptions import pyz3multiException
+from pyz3multi.types import GameMode, ImportType
+
+def make_bot(token, name, listen=False, **kwargs):
+    """A bot for one command; ``listen`` is only needed to wait for replies."""
+    return MultiworldBot(token, name, listen=listen, lobby_snapshot=False, **kwargs)
+
+def open_game(bot, guid, password=None):
+    """A Game for ``guid`` without going through the lobby."""
+    game = bot.game_class(
+        bot=bot,
+        name=None,
+        description=None,
+        has_password=password is not None,
+        game=guid,
+        world_count=None,
+        created=None,
+        mode=None,
+        password="" if password is None else password
+    )
+    bot.games[guid] = game
+    return game
+
+async def run(bot, command, *args, timeout=None, **kwargs):
+    """Run ``command(bot, ...)`` and close the bot, returning what the command returned.
+
+    Gives up with a pyz3multiException after ``timeout`` seconds (the bot's
+    ``request_timeout`` by default), rather than leaving the reconnect
+    scheduler to retry an unreachable service forever.
+    """
+    timeout = bot.request_timeout if timeout is None else timeout
+    try:
+        return await asyncio.wait_for(command(bot, *args, **kwargs), timeout)
+    except asyncio.TimeoutError:
+        raise pyz3multiException(f'{command.__name__} did not finish within {timeout} seconds') from None
+    finally:
+        await bot.close()
+
+async def create(bot, name, description, password=None, mode=GameMode.Multiworld.value, wait=False):
+    """Create a room.
+
+    Returns the creation token once the Create is sent, or with ``wait`` the
+    new room's GUID once it's ready (the bot has to be listening for that).
+    """
+    creation_token = str(uuid.uuid4())
+    ready = await bot.lobby.create(name, description, password=password, mode=mode, creation_token=creation_token)
+    if wait:
+        return (await ready).game
+    if not await bot.lobby.sender.drain(bot.request_timeout):
+        raise pyz3multiException('Failed to send the Create request')
+    return creation_token
+
+async def destroy(bot, guid, password=None, save=False):
+    await (await open_game(bot, guid, password).destroy(save=save))
+
+async def import_records(bot, guid, path, password=None, import_type=ImportType.V31JSON.value):
+    """Stream a records file into a room."""
+    import pathlib
+    await (await open_game(bot, guid, password).import_records(pathlib.Path(path), import_type=import_type))
+
+async def chat(bot, guid, body, password=None):
+    await (await open_game(bot, guid, password).chat(body))
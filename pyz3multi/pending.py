@@ -0,0 +1,93 @@
+import asyncio
+import logging
+
+from pyz3multi.exceptions import PendingRequestEvicted
+
+log = logging.getLogger(__name__)
+
+class PendingRequests():
+    """Futures for requests that are waiting on a reply from the service.
+
+    Each request is registered under a key (a creation token, say) and any
+    number of aliases, such as the ``id`` stamped on the outgoing payload, so
+    the reply can be matched on whichever one it carries.  Requests that get
+    no reply within ``timeout`` seconds fail with ``asyncio.TimeoutError``;
+    once more than ``max_pending`` are outstanding the oldest are failed with
+    ``PendingRequestEvicted``.
+    """
+
+    def __init__(self, timeout=60, max_pending=1000):
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._pending = {}
+        self._aliases = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, key):
+        return self._key(key) in self._pending
+
+    def _key(self, key):
+        return self._aliases.get(key, key)
+
+    def register(self, key, aliases=(), timeout=None):
+        if key in self._pending:
+            raise ValueError(f"A request is already pending for {key}")
+
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        timeout = self.timeout if timeout is None else timeout
+        handle = loop.call_later(timeout, self._expire, key) if timeout else None
+        self._pending[key] = (future, handle, tuple(aliases))
+        for alias in aliases:
+            self._aliases[alias] = key
+        future.add_done_callback(lambda f: self._forget(key, f))
+
+        while len(self._pending) > self.max_pending:
+            oldest = next(iter(self._pending))
+            log.warning(f"Evicting pending request {oldest}")
+            evicted = self._pending[oldest][0]
+            self.reject(oldest, PendingRequestEvicted(f"Request {oldest} was evicted before a reply arrived"))
+            # the done callback won't run until the loop gets a turn, so
+            # drop it now or this never gets below max_pending
+            self._forget(oldest, evicted)
+        return future
+
+    def _forget(self, key, future):
+        entry = self._pending.get(key)
+        if entry is None or entry[0] is not future:
+            return
+        del self._pending[key]
+        _, handle, aliases = entry
+        if handle is not None:
+            handle.cancel()
+        for alias in aliases:
+            self._aliases.pop(alias, None)
+
+    def _expire(self, key):
+        self.reject(key, asyncio.TimeoutError(f"No reply to request {key}"))
+
+    def resolve(self, key, result=None):
+        entry = self._pending.get(self._key(key))
+        if entry is None or entry[0].done():
+            return False
+        entry[0].set_result(result)
+        return True
+
+    def reject(self, key, exc):
+        entry = self._pending.get(self._key(key))
+        if entry is None or entry[0].done():
+            return False
+        entry[0].set_exception(exc)
+        return True
+
+    def cancel(self, key):
+        entry = self._pending.get(self._key(key))
+        if entry is None:
+            return False
+        return entry[0].cancel()
+
+    def cancel_all(self):
+        for future, _, _ in list(self._pending.values()):
+            future.cancel()
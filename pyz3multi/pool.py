@@ -0,0 +1,141 @@
+import asyncio
+import logging
+
+from pyz3multi.bot import MultiworldBot
+from pyz3multi.bulk import BulkRunner
+from pyz3multi.registry import GameRegistry
+from pyz3multi.websocket import Lobby
+
+log = logging.getLogger(__name__)
+
+class PoolLobby(Lobby):
+    """The pool's one lobby connection; keeps every identity's copy of a room in step."""
+
+    __slots__ = ()
+
+    async def on_game_update(self, game, changes):
+        await super().on_game_update(game, changes)
+        for identity in self.bot.identities.values():
+            mine = identity.games.get(game.game)
+            if mine is not None:
+                for attr, (old, new) in changes.items():
+                    setattr(mine, attr, new)
+                identity.games.reindex(mine, changes)
+
+    async def on_game_destroy(self, game):
+        await super().on_game_destroy(game)
+        for identity in self.bot.identities.values():
+            await identity.forget_game(game.game)
+
+class PoolIdentity(MultiworldBot):
+    """One bot identity hosted by a BotPool.
+
+    It shares the pool's settings and the components in ``SHARED``: the
+    lobby, connection budget, reconnect scheduler, metrics, listeners and
+    recorder.  It has its own token, name, Game connections and bulk rate
+    limits, and no state cache (the pool's snapshot covers the rooms).
+    ``games`` only holds the rooms this identity has touched; ``get_game``
+    makes its own Game for any room the pool's lobby knows about, so every
+    send to a room is stamped with this identity's token.
+    """
+
+    SHARED = (
+        'base_address', 'dispatch_high_water', 'dispatch_workers', 'request_timeout',
+        'flush_timeout', 'send_rate', 'send_burst', 'heartbeat_interval', 'heartbeat_timeout',
+        'listen', 'lobby_snapshot', 'peek_threshold', 'state_interval', 'reconcile_delay',
+        'connections', 'metrics', 'events', 'reconnects', 'recorder', 'lobby',
+    )
+
+    def __init__(self, pool, token, name):
+        # MultiworldBot.__init__ would build a lobby and connection manager
+        # of its own, so only the shared parts are copied and the rest made here
+        for attr in self.SHARED:
+            setattr(self, attr, getattr(pool, attr))
+        self.pool = pool
+        self.token = token
+        self.name = name
+        self.state = None
+        self.restored = set()
+        self._state_task = None
+        self.bulk = BulkRunner(concurrency=pool.bulk.concurrency, rate=pool.bulk.rate, burst=pool.bulk.burst)
+        self.games = GameRegistry()
+
+    def get_game(self, guid):
+        game = self.games.get(guid)
+        if game is not None:
+            return game
+        shared = self.pool.get_game(guid)
+        if shared is None:
+            return None
+        game = self.game_class(
+            bot=self,
+            name=shared.name,
+            description=shared.description,
+            has_password=shared.has_password,
+            game=shared.game,
+            world_count=shared.world_count,
+            created=shared._created,
+            mode=shared.mode,
+            password=shared.password
+        )
+        self.games[guid] = game
+        return game
+
+    def _own(self, game):
+        return self.get_game(game if isinstance(game, str) else game.game)
+
+    async def subscribe(self, game, subscriber=None):
+        await self.connections.subscribe(self._own(game), subscriber)
+
+    async def unsubscribe(self, game, subscriber=None):
+        await self.connections.unsubscribe(self._own(game), subscriber)
+
+    async def create(self, password=None, **kwargs):
+        """Create a room as this identity and return this identity's Game for it."""
+        shared = await (await self.lobby.create(sender=self.token, password=password, **kwargs))
+        game = self.get_game(shared.game)
+        game.password = "" if password is None else password
+        return game
+
+    async def forget_game(self, guid):
+        game = self.games.get(guid)
+        if game is not None:
+            await self.connections.forget(game)
+            self.bulk.forget(game.endpoint)
+            del self.games[guid]
+
+    async def start(self):
+        # the pool's lobby is already running
+        pass
+
+    async def close(self):
+        """Close this identity's Game connections; the pool keeps running."""
+        await asyncio.gather(*[self.forget_game(guid) for guid in list(self.games)], return_exceptions=True)
+        self.pool.identities.pop(self.token, None)
+
+class BotPool(MultiworldBot):
+    """Hosts many bot identities in one process over one lobby connection.
+
+    The pool itself is a MultiworldBot for its own ``token``/``name``: it
+    owns the lobby socket, the shared game registry and the connection
+    budget.  ``identity(token, name)`` adds another identity on top (see
+    PoolIdentity); its Game connections count against the same
+    ``max_connections_per_host``.
+    """
+
+    lobby_class = PoolLobby
+
+    def __init__(self, token, name, **kwargs):
+        super().__init__(token, name, **kwargs)
+        self.identities = {}
+
+    def identity(self, token, name):
+        """Return the identity for ``token``, adding it to the pool if it's new."""
+        identity = self.identities.get(token)
+        if identity is None:
+            identity = self.identities[token] = PoolIdentity(self, token, name)
+        return identity
+
+    async def close(self):
+        await asyncio.gather(*[identity.close() for identity in list(self.identities.values())], return_exceptions=True)
+        await super().close()
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+class TokenBucket():
+    """A token bucket refilled at ``rate`` tokens per second, holding at most ``burst``."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self):
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, tokens=1):
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens=1):
+        # waiters are served in order so a burst can't starve anyone
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
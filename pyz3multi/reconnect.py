@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import random
+
+from pyz3multi.backoff import DecorrelatedJitterBackoff
+from pyz3multi.exceptions import ConnectionLimitReached
+from pyz3multi.ratelimit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+class ReconnectScheduler():
+    """Reconnects dropped clients without stampeding the service.
+
+    One scheduler is shared by every connection in a bot.  Each reconnect
+    waits a random slice of ``base`` before its first attempt, every attempt
+    spends a token from a bucket refilled at ``rate`` per second, and failed
+    attempts back off with decorrelated jitter up to ``cap`` seconds.  A
+    client has at most one reconnect in flight.
+    """
+
+    def __init__(self, rate=20, burst=20, base=1, cap=60):
+        self.base = base
+        self.cap = cap
+        self.bucket = TokenBucket(rate, burst)
+        self.reconnects = 0
+        self._tasks = {}
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def task(self, client):
+        return self._tasks.get(client)
+
+    def schedule(self, client):
+        task = self._tasks.get(client)
+        if task is None:
+            task = self._tasks[client] = asyncio.create_task(self._reconnect(client))
+            task.add_done_callback(lambda t: self._forget(client, t))
+        return task
+
+    def _forget(self, client, task):
+        if self._tasks.get(client) is task:
+            del self._tasks[client]
+
+    def cancel(self, client):
+        task = self._tasks.pop(client, None)
+        if task is not None:
+            task.cancel()
+
+    def cancel_all(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+
+    async def _reconnect(self, client):
+        backoff = DecorrelatedJitterBackoff(self.base, self.cap)
+        await asyncio.sleep(random.uniform(0, self.base))
+
+        while True:
+            await self.bucket.acquire()
+            try:
+                await client.connect()
+            except ConnectionLimitReached as e:
+                # back off like any other failed attempt until a slot frees up
+                log.warning(str(e))
+
+            if client.socket is not None and client.socket.open:
+                self.reconnects += 1
+                log.info(f'Reconnected to {client.endpoint}')
+                return
+
+            retry = backoff.delay()
+            log.info(f'Reconnecting to {client.endpoint} failed: Retrying in {retry:.1f} seconds...')
+            await asyncio.sleep(retry)
@@ -0,0 +1,84 @@
+import asyncio
+import codecs
+import os
+import zlib
+
+from pyz3multi import codec
+
+CHUNK_SIZE = 64 * 1024
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+async def iter_bytes(source, chunk_size=CHUNK_SIZE):
+    """Yield raw chunks from bytes, a file path or an async iterator of bytes."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for i in range(0, len(view), chunk_size):
+            yield bytes(view[i:i + chunk_size])
+    elif isinstance(source, os.PathLike):
+        loop = asyncio.get_event_loop()
+        with open(source, 'rb') as f:
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    elif hasattr(source, '__aiter__'):
+        async for chunk in source:
+            yield chunk
+    else:
+        raise TypeError(f"Cannot read records from {type(source).__name__}")
+
+async def iter_text(source, chunk_size=CHUNK_SIZE):
+    """Yield the decoded records text from ``source``, chunk by chunk.
+
+    Gzipped input is detected by its magic number and inflated as it streams,
+    so the whole decompressed document is never held in memory.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    inflater = None
+    # the first bytes are held back until there are enough to spot gzip by
+    head = b''
+    sniffed = False
+
+    async for chunk in iter_bytes(source, chunk_size):
+        if not sniffed:
+            head += chunk
+            if len(head) < len(GZIP_MAGIC):
+                continue
+            sniffed = True
+            chunk = head
+            if chunk.startswith(GZIP_MAGIC):
+                inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if inflater is not None:
+            chunk = inflater.decompress(chunk)
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+    if not sniffed:
+        # too short to be gzipped
+        tail = head
+    else:
+        tail = inflater.flush() if inflater is not None else b''
+    text = decoder.decode(tail, final=True)
+    if text:
+        yield text
+
+async def json_string_fragments(payload, field, source, chunk_size=CHUNK_SIZE):
+    """Yield a JSON document for ``payload`` with ``field`` streamed from ``source``.
+
+    The fragments concatenate to the same document ``codec.dumps`` would build
+    if ``payload[field]`` held the full records text.
+    """
+    header = codec.dumps(payload)
+    if header == '{}':
+        yield f'{{"{field}":"'
+    else:
+        yield f'{header[:-1]},"{field}":"'
+
+    async for text in iter_text(source, chunk_size):
+        # escape each piece on its own; JSON string escaping is per character
+        yield codec.dumps(text)[1:-1]
+
+    yield '"}'
@@ -0,0 +1,173 @@
+import bisect
+from collections.abc import MutableMapping
+from datetime import datetime
+
+from pyz3multi.types import GameMode
+
+def _value(value):
+    return value.value if isinstance(value, GameMode) else value
+
+def _created_key(game):
+    created = game._created
+    if created is None:
+        return 0
+    if isinstance(created, datetime):
+        return created.timestamp()
+    return created
+
+class GameRegistry(MutableMapping):
+    """The games a bot knows about, keyed by GUID, with secondary indexes.
+
+    Behaves like the plain dict ``MultiworldBot.games`` used to be, but also
+    indexes games by mode, password, world count, creation time and whether
+    they still have unclaimed worlds, so ``find`` never has to scan every
+    room.  Whoever mutates a game is responsible for calling ``reindex`` or
+    ``worlds_changed`` afterwards; the lobby and game handlers already do.
+    """
+
+    def __init__(self):
+        self._games = {}
+        self._by_mode = {}
+        self._by_password = {True: set(), False: set()}
+        self._by_world_count = {}
+        self._unclaimed = set()
+        self._claimed_counts = {}
+        # (created, guid) pairs, oldest first
+        self._by_created = []
+        self._created = {}
+
+    def __getitem__(self, guid):
+        return self._games[guid]
+
+    def __setitem__(self, guid, game):
+        if guid in self._games:
+            self._unindex(guid, self._games[guid])
+        self._games[guid] = game
+        self._index(guid, game)
+
+    def __delitem__(self, guid):
+        game = self._games.pop(guid)
+        self._unindex(guid, game)
+
+    def __iter__(self):
+        return iter(self._games)
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, guid):
+        return guid in self._games
+
+    def _index(self, guid, game):
+        self._by_mode.setdefault(game.mode, set()).add(guid)
+        self._by_password[bool(game.has_password)].add(guid)
+        self._by_world_count.setdefault(game.world_count, set()).add(guid)
+
+        key = (_created_key(game), guid)
+        self._created[guid] = key
+        bisect.insort(self._by_created, key)
+
+        self._claimed_counts[guid] = sum(1 for world in game.worlds.values() if world.claimed)
+        self._update_unclaimed(guid, game)
+
+    def _unindex(self, guid, game):
+        self._discard(self._by_mode, game.mode, guid)
+        self._by_password[True].discard(guid)
+        self._by_password[False].discard(guid)
+        self._discard(self._by_world_count, game.world_count, guid)
+
+        key = self._created.pop(guid)
+        i = bisect.bisect_left(self._by_created, key)
+        if i < len(self._by_created) and self._by_created[i] == key:
+            del self._by_created[i]
+
+        self._claimed_counts.pop(guid, None)
+        self._unclaimed.discard(guid)
+
+    @staticmethod
+    def _discard(index, value, guid):
+        bucket = index.get(value)
+        if bucket is not None:
+            bucket.discard(guid)
+            if not bucket:
+                del index[value]
+
+    def _update_unclaimed(self, guid, game):
+        # worlds we haven't been told about yet count as unclaimed
+        if self._claimed_counts[guid] < (game.world_count or 0):
+            self._unclaimed.add(guid)
+        else:
+            self._unclaimed.discard(guid)
+
+    def reindex(self, game, changes):
+        """Move ``game`` between indexes after the lobby changed ``changes``.
+
+        ``changes`` maps attribute names to ``(old, new)`` pairs, as passed to
+        ``Lobby.on_game_update``.
+        """
+        guid = game.game
+        if guid not in self._games:
+            return
+        if 'mode' in changes:
+            self._discard(self._by_mode, changes['mode'][0], guid)
+            self._by_mode.setdefault(game.mode, set()).add(guid)
+        if 'has_password' in changes:
+            self._by_password[bool(changes['has_password'][0])].discard(guid)
+            self._by_password[bool(game.has_password)].add(guid)
+        if 'world_count' in changes:
+            self._discard(self._by_world_count, changes['world_count'][0], guid)
+            self._by_world_count.setdefault(game.world_count, set()).add(guid)
+            self._update_unclaimed(guid, game)
+
+    def worlds_changed(self, game):
+        """Refresh the unclaimed index after a WorldDescription or WorldClaim."""
+        guid = game.game
+        if guid not in self._games:
+            return
+        self._claimed_counts[guid] = sum(1 for world in game.worlds.values() if world.claimed)
+        self._update_unclaimed(guid, game)
+
+    def find(self, mode=None, has_password=None, world_count=None, unclaimed=None, newest_first=True, limit=None):
+        """Return the games matching every given criterion, ordered by creation time."""
+        sets = []
+        if mode is not None:
+            sets.append(self._by_mode.get(_value(mode), set()))
+        if has_password is not None:
+            sets.append(self._by_password[bool(has_password)])
+        if world_count is not None:
+            sets.append(self._by_world_count.get(world_count, set()))
+        if unclaimed is not None:
+            if unclaimed:
+                sets.append(self._unclaimed)
+            else:
+                sets.append(self._games.keys() - self._unclaimed)
+
+        if not sets:
+            candidates = None
+            size = len(self._games)
+        else:
+            sets.sort(key=len)
+            candidates = set(sets[0]).intersection(*sets[1:])
+            size = len(candidates)
+
+        if limit is not None and size > len(self._games) // 4:
+            # most games match, walking the time index is cheaper than sorting
+            ordered = reversed(self._by_created) if newest_first else iter(self._by_created)
+            results = []
+            for _, guid in ordered:
+                if candidates is None or guid in candidates:
+                    results.append(self._games[guid])
+                    if len(results) >= limit:
+                        break
+            return results
+
+        if candidates is None:
+            candidates = self._games.keys()
+        guids = sorted(candidates, key=self._created.__getitem__, reverse=newest_first)
+        if limit is not None:
+            guids = guids[:limit]
+        return [self._games[guid] for guid in guids]
+
+    def open_rooms(self, mode=GameMode.Multiworld, limit=None):
+        """Passwordless rooms with unclaimed worlds, newest first."""
+        return self.find(mode=mode, has_password=False, unclaimed=True, limit=limit)
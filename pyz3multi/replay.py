@@ -0,0 +1,213 @@
+import asyncio
+import gzip
+import logging
+import os
+import struct
+import time
+
+from pyz3multi.exceptions import pyz3multiException
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'PZ3MREC1'
+
+# kind, wall clock timestamp, endpoint index, length of what follows
+HEADER = struct.Struct('<BdHI')
+
+ENDPOINT = 0
+IN = 1
+OUT = 2
+
+def _open(path, mode, compression=None):
+    """Open a recording, compressed according to ``compression`` or the file suffix."""
+    if compression is None:
+        compression = {'.gz': 'gzip', '.zst': 'zstd'}.get(os.path.splitext(path)[1])
+    if compression == 'gzip':
+        return gzip.open(path, mode)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise pyz3multiException('zstd recordings need the zstandard package')
+        f = open(path, mode)
+        if 'w' in mode:
+            return zstandard.ZstdCompressor().stream_writer(f, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+    if compression is not None:
+        raise ValueError(f'Unknown compression {compression!r}')
+    return open(path, mode)
+
+def _read_exact(f, size):
+    data = b''
+    while len(data) < size:
+        chunk = f.read(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+class Recorder():
+    """Appends every frame a bot sends or receives to a recording.
+
+    Each record is a small fixed header (direction, wall clock time,
+    endpoint index, length) followed by the frame itself; endpoints are
+    written out once and referred to by index after that.  Streamed
+    ImportRecords bodies don't pass through ``raw_send`` and aren't
+    recorded.  Pass ``compression='gzip'`` or ``'zstd'``, or name the file
+    ``*.gz``/``*.zst``.
+    """
+
+    def __init__(self, path, compression=None):
+        self.path = path
+        self.frames = 0
+        self._file = _open(path, 'wb', compression)
+        self._file.write(MAGIC)
+        self._endpoints = {}
+
+    def record(self, direction, endpoint, frame):
+        if self._file is None:
+            return
+        now = time.time()
+        index = self._endpoints.get(endpoint)
+        if index is None:
+            index = self._endpoints[endpoint] = len(self._endpoints)
+            name = endpoint.encode('utf-8')
+            self._file.write(HEADER.pack(ENDPOINT, now, index, len(name)) + name)
+        data = frame.encode('utf-8') if isinstance(frame, str) else frame
+        self._file.write(HEADER.pack(direction, now, index, len(data)))
+        self._file.write(data)
+        self.frames += 1
+
+    def sent(self, endpoint, frame):
+        self.record(OUT, endpoint, frame)
+
+    def received(self, endpoint, frame):
+        self.record(IN, endpoint, frame)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            log.info(f'Recorded {self.frames} frames to {self.path}')
+
+def read_frames(path, compression=None):
+    """Yield ``(direction, timestamp, endpoint, frame)`` for every frame in a recording."""
+    with _open(path, 'rb', compression) as f:
+        if _read_exact(f, len(MAGIC)) != MAGIC:
+            raise pyz3multiException(f'{path} is not a pyz3multi recording')
+        endpoints = {}
+        while True:
+            try:
+                kind, timestamp, index, size = HEADER.unpack(_read_exact(f, HEADER.size))
+                data = _read_exact(f, size)
+            except EOFError:
+                # a recording cut short mid-record still replays up to there
+                return
+            if kind == ENDPOINT:
+                endpoints[index] = data.decode('utf-8')
+            else:
+                yield kind, timestamp, endpoints[index], data.decode('utf-8')
+
+class ReplaySink():
+    """Stands in for a client's SendQueue during a replay, discarding what's sent."""
+
+    handshake = False
+
+    def __init__(self):
+        self.sent = 0
+        self.ready = asyncio.Event()
+        self.ready.set()
+
+    def __len__(self):
+        return 0
+
+    def put(self, frame, key=None, description=None, message_type=None):
+        self.sent += 1
+        future = asyncio.get_event_loop().create_future()
+        future.set_result(None)
+        return future
+
+    async def flush(self, timeout=None):
+        pass
+
+    def stop(self):
+        pass
+
+class Replayer():
+    """Feeds a recording's incoming frames to a bot's Lobby and Game handlers.
+
+    Frames are decoded and filtered the way ``listen`` does it, then handed
+    straight to ``on_raw_message``, so handler throughput can be measured
+    against real traffic without a network.  ``speed`` scales the recorded
+    gaps between frames (2 plays twice as fast); ``None`` replays as fast
+    as the handlers go.  Nothing is sent: every client the replay touches
+    has its SendQueue swapped for a ReplaySink.
+    """
+
+    def __init__(self, bot, path, speed=1.0, compression=None):
+        self.bot = bot
+        self.path = path
+        self.speed = speed
+        self.compression = compression
+        self.sink = ReplaySink()
+        self.frames = 0
+        self.skipped = 0
+        self.elapsed = 0
+
+    def client_for(self, endpoint):
+        if endpoint == self.bot.lobby.endpoint:
+            return self.bot.lobby
+        if endpoint.startswith('api/game/'):
+            return self.bot.get_game(endpoint[len('api/game/'):])
+        return None
+
+    async def run(self):
+        start = time.perf_counter()
+        first = None
+        for direction, timestamp, endpoint, frame in read_frames(self.path, self.compression):
+            if direction != IN:
+                continue
+            if self.speed:
+                if first is None:
+                    first = timestamp
+                delay = (timestamp - first) / self.speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            client = self.client_for(endpoint)
+            if client is None:
+                # a game the recorded lobby never told us about
+                self.skipped += 1
+                continue
+            client.sender = self.sink
+            payload = client.receive(frame)
+            if payload is not None:
+                await client.on_raw_message(payload)
+            self.frames += 1
+        self.elapsed = time.perf_counter() - start
+        return self.stats()
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'sent': self.sink.sent,
+            'elapsed': self.elapsed,
+            'frames_per_sec': self.frames / self.elapsed if self.elapsed else 0,
+        }
+
+async def _main(args):
+    from pyz3multi.bot import MultiworldBot
+    bot = MultiworldBot(token=None, name='replay')
+    stats = await Replayer(bot, args.recording, speed=args.speed or None).run()
+    for key, value in stats.items():
+        print(f'{key:>16} {value}')
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Replay a recorded session through the client handlers.')
+    parser.add_argument('recording')
+    parser.add_argument('--speed', type=float, default=0, help='1 for real time, N for N times faster, 0 for as fast as possible')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(_main(args))
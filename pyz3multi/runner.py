@@ -0,0 +1,99 @@
+import asyncio
+import concurrent.futures
+import logging
+import signal
+
+from pyz3multi.exceptions import pyz3multiException
+
+log = logging.getLogger(__name__)
+
+def install_uvloop(required=False):
+    """Make uvloop the event loop policy if it's installed.
+
+    Returns whether it was installed.  With ``required`` a missing uvloop is
+    an error rather than a silent fallback to the stock loop.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        if required:
+            raise pyz3multiException('uvloop was requested but is not installed, install pyz3multi[uvloop]')
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    log.debug('Using the uvloop event loop')
+    return True
+
+def tune_loop(loop, debug=False, slow_callback_duration=None, executor_workers=None):
+    """Apply the runner's loop knobs to a running loop."""
+    loop.set_debug(debug)
+    if slow_callback_duration is not None:
+        loop.slow_callback_duration = slow_callback_duration
+    if executor_workers is not None:
+        loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=executor_workers))
+
+def add_shutdown_handlers(loop, callback):
+    """Call ``callback`` on SIGINT/SIGTERM.  Returns False where the loop can't do that (Windows)."""
+    try:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, callback, sig)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        return False
+    return True
+
+def remove_shutdown_handlers(loop):
+    try:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        pass
+
+async def serve(bot, *coros, debug=False, slow_callback_duration=None, executor_workers=None):
+    """Start ``bot`` alongside ``coros`` and run until a signal, then shut down cleanly."""
+    loop = asyncio.get_running_loop()
+    tune_loop(loop, debug, slow_callback_duration, executor_workers)
+    stopping = asyncio.Event()
+
+    def stop(sig=None):
+        if sig is not None:
+            log.info(f'Received {signal.Signals(sig).name}, shutting down')
+        stopping.set()
+
+    add_shutdown_handlers(loop, stop)
+    tasks = []
+    try:
+        await bot.start()
+        tasks = [asyncio.create_task(coro) for coro in coros]
+        for task in tasks:
+            # a helper that finishes or dies shouldn't take the bot down with it
+            task.add_done_callback(_log_task)
+        await stopping.wait()
+    finally:
+        remove_shutdown_handlers(loop)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # drains every send queue and closes the sockets in parallel
+        await bot.close()
+
+def _log_task(task):
+    if not task.cancelled() and task.exception() is not None:
+        log.error(f'Task {task!r} failed', exc_info=task.exception())
+
+def run(bot, *coros, uvloop=None, debug=False, slow_callback_duration=None, executor_workers=None):
+    """Run ``bot`` until SIGINT/SIGTERM (or Ctrl-C), then close it gracefully.
+
+    ``uvloop`` is used when installed unless ``uvloop=False``; ``True``
+    insists on it.
+    """
+    if uvloop is not False:
+        install_uvloop(required=bool(uvloop))
+    try:
+        asyncio.run(serve(
+            bot, *coros,
+            debug=debug,
+            slow_callback_duration=slow_callback_duration,
+            executor_workers=executor_workers
+        ))
+    except KeyboardInterrupt:
+        # only reached where signal handlers aren't supported
+        pass
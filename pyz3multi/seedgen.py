@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import uuid
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from pyz3multi.exceptions import pyz3multiException
+from pyz3multi.types import ImportType
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = pathlib.Path(tempfile.gettempdir()) / 'pyz3multi-seeds'
+
+def settings_key(settings):
+    """A stable hash of a settings document, used to group seeds on disk."""
+    canonical = json.dumps(settings, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class SeedCache():
+    """A size-bounded, content-addressed store of generated records files.
+
+    Seeds live at ``<directory>/<settings key>/<sha256 of records>.gz``.
+    Once the files add up to more than ``max_bytes`` the oldest seeds of
+    the least recently used settings are removed; a settings folder counts
+    as used whenever a seed is added to or taken from it.  Files are written
+    under a temporary name and renamed into place, so a crash never leaves
+    a partial seed behind.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=1024 ** 3):
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        # store() evicts on an executor thread after every write
+        self._evicting = threading.Lock()
+
+    @staticmethod
+    def _stat(path):
+        # another thread or process may have claimed or evicted it since it was listed
+        try:
+            return path.stat()
+        except FileNotFoundError:
+            return None
+
+    def seeds(self, key):
+        """Paths of the seeds held for ``key``, oldest first."""
+        try:
+            paths = [p for p in (self.directory / key).iterdir() if p.suffix == '.gz']
+        except FileNotFoundError:
+            return []
+        stamped = []
+        for path in paths:
+            stat = self._stat(path)
+            if stat is not None:
+                stamped.append((stat.st_mtime, path))
+        return [path for _, path in sorted(stamped)]
+
+    async def store(self, key, chunks):
+        """Write the async iterator of bytes ``chunks`` into the cache and return its path."""
+        loop = asyncio.get_event_loop()
+        folder = self.directory / key
+        await loop.run_in_executor(None, lambda: folder.mkdir(parents=True, exist_ok=True))
+        partial = folder / f'.{uuid.uuid4()}.part'
+        digest = hashlib.sha256()
+        f = await loop.run_in_executor(None, open, partial, 'wb')
+        try:
+            async for chunk in chunks:
+                digest.update(chunk)
+                await loop.run_in_executor(None, f.write, chunk)
+        except BaseException:
+            f.close()
+            partial.unlink()
+            raise
+        f.close()
+        path = folder / f'{digest.hexdigest()}.gz'
+        os.replace(partial, path)
+        await loop.run_in_executor(None, self.evict)
+        return path
+
+    def claim(self, path):
+        """Move ``path`` out of the cache and return its new path.
+
+        The caller owns the file afterwards and should delete it when done.
+        Returns None if it's already gone.
+        """
+        taken = self.directory / 'taken' / path.name
+        taken.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(path, taken)
+        except FileNotFoundError:
+            return None
+        return taken
+
+    def take(self, key):
+        """Claim the oldest seed for ``key``, or return None if there aren't any."""
+        for path in self.seeds(key):
+            taken = self.claim(path)
+            if taken is not None:
+                return taken
+        return None
+
+    def evict(self):
+        with self._evicting:
+            files = []
+            for folder in self.directory.iterdir():
+                if folder.is_dir() and folder.name != 'taken':
+                    used = folder.stat().st_mtime
+                    for path in folder.glob('*.gz'):
+                        stat = self._stat(path)
+                        if stat is not None:
+                            files.append((used, stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, _, size, _ in files)
+            for _, _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                log.debug(f'Evicting cached seed {path}')
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+class SeedGenerator():
+    """Generates seeds over one pooled HTTP session and keeps pools of them on disk.
+
+    ``url`` is the seed generation endpoint, which is POSTed a settings
+    document and answers with gzipped records.  At most ``concurrency``
+    generations run at once.  ``pool_size`` seeds per settings document are
+    kept ready in ``cache`` so rooms don't wait on generation; see
+    ``prefill`` and ``import_into``.  Needs aiohttp (``pip install
+    pyz3multi[seedgen]``).
+    """
+
+    def __init__(self, url, auth=None, concurrency=4, pool_size=2, cache=None, timeout=300):
+        if aiohttp is None:
+            raise pyz3multiException('Seed generation needs aiohttp, install pyz3multi[seedgen]')
+        self.url = url
+        self.auth = auth
+        self.pool_size = pool_size
+        self.cache = SeedCache() if cache is None else cache
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._semaphore = None
+        self._session = None
+        self._refills = {}
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                auth=self.auth,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def close(self):
+        for task in self._refills.values():
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def generate(self, settings):
+        """Generate a new seed, add it to the pool for ``settings`` and return its path."""
+        key = settings_key(settings)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            async with self.session.post(self.url, json=settings) as resp:
+                if resp.status != 200:
+                    raise pyz3multiException(f'Seed generation failed with HTTP {resp.status}: {await resp.text()}')
+                path = await self.cache.store(key, resp.content.iter_chunked(64 * 1024))
+        log.info(f'Generated seed {path.name} for settings {key[:12]}')
+        return path
+
+    async def prefill(self, settings, count=None):
+        """Generate seeds until ``count`` (the pool size by default) are waiting."""
+        key = settings_key(settings)
+        missing = (self.pool_size if count is None else count) - len(self.cache.seeds(key))
+        if missing > 0:
+            await asyncio.gather(*[self.generate(settings) for _ in range(missing)])
+
+    def refill(self, settings):
+        """Top the pool up in the background, if it isn't already being topped up."""
+        key = settings_key(settings)
+        task = self._refills.get(key)
+        if task is None or task.done():
+            task = self._refills[key] = asyncio.create_task(self.prefill(settings))
+            task.add_done_callback(self._log_refill)
+        return task
+
+    @staticmethod
+    def _log_refill(task):
+        if not task.cancelled() and task.exception() is not None:
+            log.error('Refilling the seed pool failed', exc_info=task.exception())
+
+    async def take(self, settings):
+        """Return the path of a seed for ``settings`` that's now the caller's to use and delete.
+
+        Comes straight from the pool when there's one waiting, otherwise a
+        seed is generated on the spot.  Either way the pool is refilled in
+        the background.
+        """
+        key = settings_key(settings)
+        path = self.cache.take(key)
+        if path is None:
+            fresh = await self.generate(settings)
+            path = self.cache.claim(fresh) or self.cache.take(key)
+            if path is None:
+                raise pyz3multiException(f'Seed {fresh.name} was evicted before it could be used, is the cache too small?')
+        self.refill(settings)
+        return path
+
+    async def import_into(self, game, settings, import_type=ImportType.V31JSON.value):
+        """Take a seed for ``settings``, stream it into ``game`` and delete it."""
+        path = await self.take(settings)
+        try:
+            await (await game.import_records(path, import_type=import_type))
+        finally:
+            path.unlink()
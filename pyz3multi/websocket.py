@@ -1,370 +1,651 @@
-__version__ = '0.0.1'
-
-import asyncio
-import json
-import logging
-import os
-import time
-import uuid
-from datetime import datetime
-
-import websockets
-
-from pyz3multi.backoff import ExponentialBackoff
-from pyz3multi.types import MessageType, ItemType, GameMode, ImportType
-
-log = logging.getLogger(__name__)
-
-ROOMREADY = {}
-
-class pyz3multiException(Exception):
-    pass
-
-class BasicMultiworldClient():
-    def __init__(self, token, bot):
-        self.bot = bot
-        self.socket = None
-
-    async def connect(self):
-        self.loop = asyncio.get_event_loop()
-
-        log.debug(f"Connecting to Multiworld Service at {self.base_address}/{self.endpoint} ...")
-
-        try:
-            self.socket = await websockets.connect(f"{self.base_address}/{self.endpoint}", ping_timeout=None, ping_interval=None)
-            self._listener = asyncio.create_task(self.listen())
-            await self.connect_handler()
-        except Exception as e:
-            if self.socket is not None:
-                if not self.socket.closed:
-                    await self.socket.close()
-                self.socket = None
-
-    async def raw_send(self, payload):
-        if self.socket is None or not self.socket.open or self.socket.closed:
-            await self.connect()
-
-        # these will be sent in every payload
-        payload['id'] = str(uuid.uuid4())
-        payload['created'] = int(datetime.utcnow().timestamp())
-        payload['sender'] = self.bot.token
-
-        try:
-            await self.socket.send(json.dumps(payload))
-        except Exception as e:
-            if self.socket is not None:
-                if not self.socket.closed:
-                    await self.socket.close()
-                self.socket = None
-        
-        if payload['type'] == MessageType.ImportRecords.value:
-            log.info(f'Payload sent to {self.endpoint} - Import records request')
-        else:
-            log.info(f'Payload sent to {self.endpoint} - {json.dumps(payload)}')
-
-    async def on_raw_message(self, payload):
-        log.info(f'Payload received from {self.endpoint} - {json.dumps(payload)}')
-
-    async def listen(self):
-        while True:
-            try:
-                data = json.loads(await self.socket.recv())
-                self.loop.create_task(self.on_raw_message(data))
-            except websockets.ConnectionClosed:
-                return self.loop.create_task(self.reconnection())
-
-    async def reconnection(self):
-        backoff = ExponentialBackoff()
-        self._listener.cancel()
-
-        while True:
-            if self.socket is None:
-                return
-            retry = backoff.delay()
-            log.info('PubSub Websocket closed: Retrying connection in %s seconds...', retry)
-
-            await self.connect()
-
-            if self.socket is not None and self.socket.open:
-                log.info(f'Reconnected to {self.endpoint}')
-                return
-
-            await asyncio.sleep(retry)
-
-    async def connect_handler(self):
-        pass
-
-    async def disconnect(self):
-        self._listener.cancel()
-        await self.socket.close()
-        self.socket = None
-
-    async def chat(self, body: str):
-        await self.raw_send(
-            payload = {
-                'type': MessageType.Chat.value,
-                'body': body
-            }
-        )
-
-class Lobby(BasicMultiworldClient):
-    def __init__(self, bot):
-        self.bot = bot
-        self.socket = None
-        self.base_address = 'wss://mw.alttpr.com'
-    
-    @property
-    def endpoint(self):
-        return 'api/lobby/'
-
-    async def on_raw_message(self, payload):
-        log.info(f'Payload received from {self.endpoint} - {json.dumps(payload)}')
-        if payload['type'] == MessageType.LobbyEntry.value:
-            if payload.get('destroyed', False):
-                await self.cleanup_game(payload)
-            else:
-                await self.update_game(payload)
-        if payload['type'] == MessageType.RoomReady.value:
-            if payload['creationToken'] in ROOMREADY:
-                await self.update_game(payload['game'])
-                func = ROOMREADY[payload['creationToken']]
-                if asyncio.iscoroutinefunction(func.func):
-                    await func(game=self.bot.games[payload['game']['game']])
-                else:
-                    func(game=self.bot.games[payload['game']['game']])
-                del ROOMREADY[payload['creationToken']]
-
-
-    async def connect_handler(self):
-        await self.lobby_request()
-
-    async def lobby_request(self):
-        await self.raw_send(
-            payload = {
-                'type': MessageType.LobbyRequest.value
-            }
-        )
-
-    async def update_game(self, payload):
-        if payload['game'] in self.bot.games:
-            game = self.bot.get_game(payload['game'])
-            game.name = payload.get('name', None)
-            game.description = payload.get('description', None)
-            game.has_password = payload.get('hasPassword', None)
-            game.world_count = payload.get('worldCount', None)
-
-        else:
-            self.bot.games[payload['game']] = Game(
-                bot=self.bot,
-                name=payload.get('name', None),
-                description=payload.get('description', None),
-                has_password=payload.get('hasPassword', None),
-                game=payload.get('game', None),
-                world_count=payload.get('worldCount', None),
-                created=datetime.utcfromtimestamp(payload.get('created', None)),
-                mode=payload.get('mode', None),
-            )
-
-    async def cleanup_game(self, payload):
-        if payload['game'] in self.bot.games:
-            game = self.bot.get_game(payload['game'])
-            if game.socket is not None:
-                await game.disconnect()
-            try:
-                del self.bot.games[payload['game']]
-            except KeyError:
-                log.info(f"Tried to remove {payload['game']} but was already removed!")
-
-    async def create(
-            self,
-            name: str,
-            description: str,
-            password: str=None,
-            mode=GameMode.Multiworld.value,
-            finish_resolution: int=ItemType.Nothing.value,
-            forfeit_resolution: int=ItemType.Nothing.value,
-            item_animation: int=ItemType.Nothing.value,
-            item_jingle: int=ItemType.Nothing.value,
-            item_toast: int=ItemType.Nothing.value,
-            creation_token: str=str(uuid.uuid4()),
-            callback=None
-        ):
-        # task = asyncio.create_task()
-        await self.raw_send(
-            payload = {
-                'type': MessageType.Create.value,
-                'name': name,
-                'description': description,
-                'password': "" if password is None else password,
-                'mode': mode,
-                'finishResolution': finish_resolution,
-                'forfeitResolution': forfeit_resolution,
-                'itemAnimation': item_animation,
-                'itemJingle': item_jingle,
-                'itemToast': item_toast,
-                'creationToken': creation_token
-            }
-        )
-        if callback is not None:
-            ROOMREADY[creation_token] = callback
-        return creation_token
-
-class Game(BasicMultiworldClient):
-    def __init__(self, bot, name, description, has_password, game, world_count, created, mode, password=""):
-        self.bot = bot
-        self.socket = None
-        self.base_address = 'wss://mw.alttpr.com'
-        self.name = name
-        self.description = description
-        self.has_password = has_password
-        self.game = game
-        self.world_count = world_count
-        self.created = created
-        self.mode = mode
-        self.password = password
-        self.players = {}
-        self.worlds = {}
-
-    @property
-    def endpoint(self):
-        return f'api/game/{self.game}'
-
-    async def on_raw_message(self, payload):
-        if payload['type'] == MessageType.ImportRecords.value:
-            log.info(f'Payload received from {self.endpoint} - Import records request.')
-        else:
-            log.info(f'Payload received from {self.endpoint} - {json.dumps(payload)}')
-        if payload['type'] == MessageType.Identify.value:
-            player = Player(
-                game = self,
-                name = payload['name'],
-                player_id = payload['sender']
-            )
-            self.players[payload['sender']] = player
-        elif payload['type'] == MessageType.WorldDescription.value:
-            world = World(
-                game = self,
-                world = payload['world'],
-                title = payload['title'],
-                description = payload['description'],
-                rng = payload['rng'],
-                mystery = payload.get('mystery', False),
-                logic = payload.get('logic', {}),
-                goals = payload.get('goals', {}),
-                gameplay = payload.get('gameplay', {}),
-                difficulty = payload.get('difficulty', {})
-            )
-            self.worlds[payload['world']] = world
-        elif payload['type'] == MessageType.WorldClaim.value:
-            self.worlds[payload['world']].claimed = payload['claim']
-        elif payload['type'] == MessageType.ImportRecords.value:
-            await self.knock()
-
-
-    async def connect_handler(self):
-        await self.knock()
-
-    async def knock(self):
-        if self.socket is None:
-            self.connect()
-        await self.raw_send(
-            payload = {
-                'type': MessageType.Knock.value,
-                'playerName': self.bot.name,
-                'password': self.password if self.has_password else ""
-            }
-        )
-
-    async def import_records(self, body, import_type=ImportType.V31JSON.value):
-        if self.socket is None:
-            self.connect()
-        await self.raw_send(
-            payload = {
-                'type': MessageType.ImportRecords.value,
-                'body': body,
-                'importType': import_type
-            }
-        )
-
-    async def destroy(self, save=False):
-        if self.socket is None:
-            self.connect()
-        await self.raw_send(
-            payload = {
-                'type': MessageType.Destroy.value,
-                'save': save
-            }
-        )
-
-    def get_player(self, guid):
-        try:
-            return self.players[guid]
-        except KeyError:
-            return None
-
-    def get_world(self, world_id):
-        try:
-            return self.worlds[world_id]
-        except KeyError:
-            return None
-
-    def __str__(self):
-        return self.game
-
-    def __repr__(self):
-        return (f'{self.__class__.__name__}('
-                f'name={self.name!r}, game={self.game!r})')
-
-class Player():
-    def __init__(self, game, name, player_id):
-        self.game = game
-        self.name = name
-        self.player_id = player_id
-
-    async def kick(self, reason, resolution):
-        if self.game.socket is None:
-            self.game.connect()
-        await self.game.raw_send(
-            payload = {
-                'type': MessageType.Kick.value,
-                'target': self.player_id,
-                'reason': reason,
-                'resolution': resolution
-            }
-        )
-
-class World():
-    def __init__(self, game: Game, world: int, title: str, description: str, rng: str, mystery: bool, logic: dict, goals: dict, gameplay: dict, difficulty: dict):
-        self.game = game
-        self.world = world
-        self.title = title
-        self.description = description
-        self.rng = rng
-        self.mystery = mystery
-        self.logic = logic
-        self.goals = goals
-        self.gameplay = gameplay
-        self.difficulty = difficulty
-        self.claimed = False
-    
-    async def claim(self):
-        if self.game.socket is None:
-            self.game.connect()
-        await self.game.raw_send(
-            payload = {
-                'type': MessageType.WorldClaim.value,
-                'world': self.world,
-                'claim': True,
-            }
-        )
-
-    async def unclaim(self):
-        if self.game.socket is None:
-            self.game.connect()
-        await self.game.raw_send(
-            payload = {
-                'type': MessageType.WorldClaim.value,
-                'world': self.world,
-                'claim': False,
-            }
+__version__ = '0.0.1'
+
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+
+import websockets
+
+from pyz3multi import codec, records
+from pyz3multi.dispatch import Dispatcher
+from pyz3multi.exceptions import ConnectionLimitReached, pyz3multiException
+from pyz3multi.gamestate import GameState
+from pyz3multi.heartbeat import Heartbeat
+from pyz3multi.metrics import frame_extra
+from pyz3multi.pending import PendingRequests
+from pyz3multi.writer import SendQueue, coalesce_key
+from pyz3multi.types import MessageType, ItemType, GameMode, ImportType
+
+log = logging.getLogger(__name__)
+
+# LobbyEntry payload keys and the Game attributes they're stored on
+LOBBY_FIELDS = (
+    ('name', 'name'),
+    ('description', 'description'),
+    ('hasPassword', 'has_password'),
+    ('worldCount', 'world_count'),
+    ('mode', 'mode'),
+)
+
+class FrozenSettings(dict):
+    """A world's settings dict, shared between worlds and so read-only.
+
+    It's still a dict, so it can be serialized like one; copy it with
+    ``dict()`` to get one that can be changed.
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('World settings are shared between worlds and read-only, copy them with dict() first')
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+SETTINGS_CACHE_SIZE = 4096
+EMPTY_SETTINGS = FrozenSettings()
+_settings = {}
+
+def intern_settings(settings):
+    """Return a shared, read-only copy of a world's settings dict.
+
+    Most worlds in the lobby use one of a handful of presets, so identical
+    logic/goals/gameplay/difficulty dicts are stored once.
+    """
+    if not settings:
+        return EMPTY_SETTINGS
+    key = codec.dumps(settings)
+    try:
+        return _settings[key]
+    except KeyError:
+        frozen = FrozenSettings(settings)
+        if len(_settings) < SETTINGS_CACHE_SIZE:
+            _settings[key] = frozen
+        return frozen
+
+class BasicMultiworldClient():
+    __slots__ = ('bot', 'socket', 'dispatcher', 'pending', 'sender', 'heartbeat', '_listener', '__weakref__')
+
+    # maps a MessageType value to the name of the coroutine that handles it
+    handlers = {}
+
+    # frames with no handler and no listener are dropped unread, unless a
+    # subclass overrides on_raw_message and so may want to see everything
+    filter_frames = True
+
+    # whether the socket counts against the bot's max_connections_per_host
+    limited = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'on_raw_message' in cls.__dict__:
+            cls.filter_frames = False
+
+    def __init__(self, token, bot):
+        self.bot = bot
+        self.socket = None
+        self.dispatcher = None
+        self.pending = PendingRequests(timeout=bot.request_timeout)
+        self.sender = SendQueue(self, flush_timeout=bot.flush_timeout, rate=bot.send_rate, burst=bot.send_burst)
+        self.heartbeat = Heartbeat(self, interval=bot.heartbeat_interval, timeout=bot.heartbeat_timeout)
+        self._listener = None
+
+    @property
+    def loop(self):
+        return asyncio.get_running_loop()
+
+    async def connect(self):
+        log.debug(f"Connecting to Multiworld Service at {self.base_address}/{self.endpoint} ...")
+
+        # a bot that only sends (see MultiworldBot's listen) never reads
+        # the socket, so it has no use for a dispatcher or a heartbeat
+        listen = self.bot.listen
+        if listen:
+            if self.dispatcher is None:
+                self.dispatcher = Dispatcher(
+                    self.on_raw_message,
+                    high_water=self.bot.dispatch_high_water,
+                    workers=self.bot.dispatch_workers
+                )
+            self.dispatcher.start()
+
+        try:
+            self.socket = await self.bot.connections.open(self)
+            if listen:
+                self._listener = asyncio.create_task(self.listen())
+            # whatever the handler sends has to go out before anything queued earlier
+            self.sender.handshake = True
+            try:
+                await self.connect_handler()
+            finally:
+                self.sender.handshake = False
+            if listen:
+                self.heartbeat.start()
+        except ConnectionLimitReached:
+            # no socket was opened; it's up to the caller whether to wait and retry
+            raise
+        except Exception as e:
+            log.warning(f'Connecting to {self.endpoint} failed: {e!r}')
+            await self.bot.connections.close(self)
+            self.socket = None
+        finally:
+            self.sender.ready.set()
+
+    def stamp(self, payload):
+        # these will be sent in every payload
+        if 'id' not in payload:
+            payload['id'] = str(uuid.uuid4())
+        payload['created'] = int(datetime.utcnow().timestamp())
+        if 'sender' not in payload:
+            payload['sender'] = self.bot.token
+
+    async def raw_send(self, payload, wait=False):
+        """Queue ``payload`` on this connection's writer.
+
+        Returns a future that resolves once the payload is on the wire; pass
+        ``wait=True`` to wait for that before returning.
+        """
+        self.stamp(payload)
+        start = time.perf_counter()
+        data = codec.dumps(payload)
+        self.bot.metrics.serialize.observe(time.perf_counter() - start)
+        if self.bot.recorder is not None:
+            self.bot.recorder.sent(self.endpoint, data)
+        if payload['type'] == MessageType.ImportRecords.value:
+            description = 'Import records request'
+        else:
+            # the encoded frame, masked and truncated if and when it's logged
+            description = codec.LazyDump(data)
+
+        future = self.sender.put(data, key=coalesce_key(payload), description=description, message_type=payload['type'])
+        if wait:
+            await future
+        return future
+
+    async def on_raw_message(self, payload):
+        if log.isEnabledFor(logging.INFO):
+            extra = frame_extra('in', self.endpoint, payload['type'])
+            if payload['type'] == MessageType.ImportRecords.value:
+                log.info('Payload received from %s - Import records request.', self.endpoint, extra=extra)
+            else:
+                log.info('Payload received from %s - %s', self.endpoint, codec.LazyDump(payload), extra=extra)
+
+        handler = self.handlers.get(payload['type'])
+        if handler is not None:
+            start = time.perf_counter()
+            await getattr(self, handler)(payload)
+            self.bot.metrics.handled(payload['type'], time.perf_counter() - start, self.endpoint)
+        await self.bot.events.emit(self, payload)
+
+    async def listen(self):
+        while True:
+            try:
+                frame = await self.socket.recv()
+            except websockets.ConnectionClosed:
+                log.info(f'Connection to {self.endpoint} closed')
+                return self.reconnection()
+            if self.bot.recorder is not None:
+                self.bot.recorder.received(self.endpoint, frame)
+            try:
+                data = self.receive(frame)
+            except Exception:
+                # one bad frame mustn't stop everything after it being read
+                self.bot.metrics.frame('dropped', None, len(frame))
+                log.warning(f'Skipped a {len(frame)} character frame from {self.endpoint} that could not be read', exc_info=True)
+                continue
+            if data is not None:
+                await self.dispatcher.put(data)
+
+    def receive(self, frame):
+        """Decode an incoming frame, or return None if nothing wants it.
+
+        Raises ValueError if the frame isn't a JSON object.
+        """
+        start = time.perf_counter()
+        data = None
+        if self.bot.peek_threshold is not None and len(frame) >= self.bot.peek_threshold:
+            # big frame: only find the routing fields now, and decode the
+            # rest if and when a handler reads it
+            try:
+                data = codec.LazyPayload(frame)
+            except ValueError:
+                pass
+        if data is None:
+            data = codec.loads(frame)
+            if not isinstance(data, dict):
+                raise ValueError(f'Expected a JSON object, got {type(data).__name__}')
+        self.bot.metrics.parse.observe(time.perf_counter() - start)
+        if not self.bot.events.wants(self, data.get('type')):
+            self.drop(data.get('type'), frame)
+            return None
+        self.bot.metrics.frame('in', data.get('type'), len(frame))
+        return data
+
+    def drop(self, message_type, frame):
+        self.bot.metrics.frame('dropped', message_type, len(frame))
+        log.debug('Dropped unwanted %s payload from %s', message_type, self.endpoint)
+
+    def reconnection(self):
+        return self.bot.reconnects.schedule(self)
+
+    async def connect_handler(self):
+        pass
+
+    async def disconnect(self):
+        self.bot.reconnects.cancel(self)
+        self.heartbeat.stop()
+        await self.sender.flush()
+        self.sender.ready.clear()
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+        await self.bot.connections.close(self)
+        self.socket = None
+
+    async def chat(self, body: str):
+        return await self.raw_send(
+            payload = {
+                'type': MessageType.Chat.value,
+                'body': body
+            }
+        )
+
+class Lobby(BasicMultiworldClient):
+    __slots__ = ('base_address',)
+
+    # the lobby is always connected, so it doesn't take a slot from the games
+    limited = False
+
+    handlers = {
+        MessageType.LobbyEntry.value: 'on_lobby_entry',
+        MessageType.RoomReady.value: 'on_room_ready',
+    }
+
+    def __init__(self, bot):
+        super().__init__(None, bot)
+        self.base_address = bot.base_address
+    
+    @property
+    def endpoint(self):
+        return 'api/lobby/'
+
+    async def on_lobby_entry(self, payload):
+        if payload.get('destroyed', False):
+            await self.cleanup_game(payload)
+        else:
+            await self.update_game(payload)
+
+    async def on_room_ready(self, payload):
+        key = payload.get('creationToken')
+        if key not in self.pending:
+            key = payload.get('id')
+            if key not in self.pending:
+                return
+        await self.update_game(payload['game'])
+        self.pending.resolve(key, self.bot.games[payload['game']['game']])
+
+    async def connect_handler(self):
+        if self.bot.lobby_snapshot:
+            await self.lobby_request()
+
+    async def lobby_request(self):
+        return await self.raw_send(
+            payload = {
+                'type': MessageType.LobbyRequest.value
+            }
+        )
+
+    async def update_game(self, payload):
+        self.bot.restored.discard(payload['game'])
+        game = self.bot.get_game(payload['game'])
+        if game is None:
+            game = self.bot.game_class(
+                bot=self.bot,
+                name=payload.get('name', None),
+                description=payload.get('description', None),
+                has_password=payload.get('hasPassword', None),
+                game=payload.get('game', None),
+                world_count=payload.get('worldCount', None),
+                created=payload.get('created', None),
+                mode=payload.get('mode', None),
+            )
+            self.bot.games[payload['game']] = game
+            await self.on_game_create(game)
+            return
+
+        # only touch the fields that actually changed
+        changes = {}
+        for key, attr in LOBBY_FIELDS:
+            if key in payload:
+                old, new = getattr(game, attr), payload[key]
+                if old != new:
+                    setattr(game, attr, new)
+                    changes[attr] = (old, new)
+        if changes:
+            self.bot.games.reindex(game, changes)
+            await self.on_game_update(game, changes)
+
+    async def cleanup_game(self, payload):
+        if payload['game'] in self.bot.games:
+            game = self.bot.get_game(payload['game'])
+            await self.bot.connections.forget(game)
+            try:
+                del self.bot.games[payload['game']]
+            except KeyError:
+                log.info(f"Tried to remove {payload['game']} but was already removed!")
+            else:
+                self.bot.metrics.endpoints.pop(game.endpoint, None)
+                self.bot.bulk.forget(game.endpoint)
+                await self.on_game_destroy(game)
+
+    async def on_game_create(self, game):
+        pass
+
+    async def on_game_update(self, game, changes):
+        pass
+
+    async def on_game_destroy(self, game):
+        pass
+
+    async def create(
+            self,
+            name: str,
+            description: str,
+            password: str=None,
+            mode=GameMode.Multiworld.value,
+            finish_resolution: int=ItemType.Nothing.value,
+            forfeit_resolution: int=ItemType.Nothing.value,
+            item_animation: int=ItemType.Nothing.value,
+            item_jingle: int=ItemType.Nothing.value,
+            item_toast: int=ItemType.Nothing.value,
+            creation_token: str=None,
+            callback=None,
+            timeout: float=None,
+            sender: str=None
+        ):
+        """Ask the service for a new room.
+
+        Returns a future that resolves to the new ``Game`` once its RoomReady
+        arrives, or fails with ``asyncio.TimeoutError`` if it doesn't arrive
+        within ``timeout`` seconds (the bot's ``request_timeout`` by default).
+        ``callback``, if given, is called with ``game=`` on success.
+        ``sender`` creates the room on behalf of another bot token.
+        """
+        if creation_token is None:
+            creation_token = str(uuid.uuid4())
+        request_id = str(uuid.uuid4())
+        future = self.pending.register(creation_token, aliases=(request_id,), timeout=timeout)
+        if callback is not None:
+            future.add_done_callback(functools.partial(self._room_ready_callback, callback))
+
+        payload = {
+            'id': request_id,
+            'type': MessageType.Create.value,
+            'name': name,
+            'description': description,
+            'password': "" if password is None else password,
+            'mode': mode,
+            'finishResolution': finish_resolution,
+            'forfeitResolution': forfeit_resolution,
+            'itemAnimation': item_animation,
+            'itemJingle': item_jingle,
+            'itemToast': item_toast,
+            'creationToken': creation_token
+        }
+        if sender is not None:
+            payload['sender'] = sender
+
+        try:
+            await self.raw_send(payload=payload)
+        except BaseException:
+            self.pending.cancel(creation_token)
+            raise
+        return future
+
+    @staticmethod
+    def _room_ready_callback(callback, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        # run the callback on its own so it can't stall the lobby's queue
+        result = callback(game=future.result())
+        if inspect.isawaitable(result):
+            asyncio.ensure_future(result)
+
+class Game(BasicMultiworldClient):
+    __slots__ = (
+        'base_address', 'name', 'description', 'has_password', 'game',
+        'world_count', '_created', 'mode', 'password', 'players', 'worlds', 'state'
+    )
+
+    handlers = {
+        MessageType.Identify.value: 'on_identify',
+        MessageType.WorldDescription.value: 'on_world_description',
+        MessageType.WorldClaim.value: 'on_world_claim',
+        MessageType.ImportRecords.value: 'on_import_records',
+        **dict.fromkeys(GameState.events, 'on_game_event'),
+    }
+
+    def __init__(self, bot, name, description, has_password, game, world_count, created, mode, password=""):
+        super().__init__(None, bot)
+        self.base_address = bot.base_address
+        self.name = name
+        self.description = description
+        self.has_password = has_password
+        self.game = game
+        self.world_count = world_count
+        self._created = created
+        self.mode = mode
+        self.password = password
+        self.players = {}
+        self.worlds = {}
+        # gameplay tracking, created with the first gameplay event
+        self.state = None
+
+    @property
+    def endpoint(self):
+        return f'api/game/{self.game}'
+
+    @property
+    def created(self):
+        # lobby entries carry a unix timestamp, only convert it when asked
+        if self._created is None or isinstance(self._created, datetime):
+            return self._created
+        return datetime.utcfromtimestamp(self._created)
+
+    async def on_identify(self, payload):
+        player = Player(
+            game = self,
+            name = payload['name'],
+            player_id = payload['sender']
+        )
+        self.players[payload['sender']] = player
+
+    async def on_world_description(self, payload):
+        if isinstance(payload, codec.LazyPayload):
+            # leave the settings in the frame until somebody reads them
+            settings = dict.fromkeys(World.SETTINGS)
+            source = payload
+        else:
+            settings = {key: intern_settings(payload.get(key)) for key in World.SETTINGS}
+            source = None
+        world = World(
+            game = self,
+            world = payload['world'],
+            title = payload['title'],
+            description = payload['description'],
+            rng = payload['rng'],
+            mystery = payload.get('mystery', False),
+            source = source,
+            **settings
+        )
+        self.worlds[payload['world']] = world
+        self.bot.games.worlds_changed(self)
+
+    async def on_world_claim(self, payload):
+        self.worlds[payload['world']].claimed = payload['claim']
+        self.bot.games.worlds_changed(self)
+
+    async def on_game_event(self, payload):
+        if self.state is None:
+            self.state = GameState()
+        self.state.apply(payload)
+
+    async def on_import_records(self, payload):
+        await self.knock()
+
+    async def connect_handler(self):
+        await self.knock()
+
+    async def knock(self):
+        return await self.raw_send(
+            payload = {
+                'type': MessageType.Knock.value,
+                'playerName': self.bot.name,
+                'password': self.password if self.has_password else ""
+            }
+        )
+
+    async def import_records(self, body, import_type=ImportType.V31JSON.value):
+        """Import a seed's records into the room.
+
+        ``body`` may be the records as a string, raw (optionally gzipped)
+        bytes, a ``pathlib.Path`` to a records file, or an async iterator
+        of bytes.  Anything but a string is streamed to the service as a
+        fragmented websocket message, so it's never fully decompressed or
+        escaped in memory.
+        """
+        payload = {
+            'type': MessageType.ImportRecords.value,
+            'importType': import_type
+        }
+        if isinstance(body, str):
+            payload['body'] = body
+            return await self.raw_send(payload)
+
+        self.stamp(payload)
+        return self.sender.put(
+            records.json_string_fragments(payload, 'body', body),
+            description='Import records request',
+            message_type=payload['type']
+        )
+
+    async def destroy(self, save=False):
+        return await self.raw_send(
+            payload = {
+                'type': MessageType.Destroy.value,
+                'save': save
+            }
+        )
+
+    def get_player(self, guid):
+        try:
+            return self.players[guid]
+        except KeyError:
+            return None
+
+    def get_world(self, world_id):
+        try:
+            return self.worlds[world_id]
+        except KeyError:
+            return None
+
+    def __str__(self):
+        return self.game
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}('
+                f'name={self.name!r}, game={self.game!r})')
+
+class Player():
+    __slots__ = ('game', 'name', 'player_id')
+
+    def __init__(self, game, name, player_id):
+        self.game = game
+        self.name = name
+        self.player_id = player_id
+
+    async def kick(self, reason, resolution):
+        return await self.game.raw_send(
+            payload = {
+                'type': MessageType.Kick.value,
+                'target': self.player_id,
+                'reason': reason,
+                'resolution': resolution
+            }
+        )
+
+def _setting(name):
+    attr = '_' + name
+
+    def fget(self):
+        if self._source is not None:
+            self._load_settings()
+        return getattr(self, attr)
+
+    def fset(self, value):
+        if self._source is not None:
+            self._load_settings()
+        setattr(self, attr, value)
+
+    return property(fget, fset)
+
+class World():
+    SETTINGS = ('logic', 'goals', 'gameplay', 'difficulty')
+
+    __slots__ = (
+        'game', 'world', 'title', 'description', 'rng', 'mystery',
+        '_logic', '_goals', '_gameplay', '_difficulty', '_source', 'claimed'
+    )
+
+    def __init__(self, game: Game, world: int, title: str, description: str, rng: str, mystery: bool, logic: dict, goals: dict, gameplay: dict, difficulty: dict, source=None):
+        self.game = game
+        self.world = world
+        self.title = title
+        self.description = description
+        self.rng = rng
+        self.mystery = mystery
+        # a LazyPayload still holding the settings, decoded on first access
+        self._source = source
+        self._logic = logic
+        self._goals = goals
+        self._gameplay = gameplay
+        self._difficulty = difficulty
+        self.claimed = False
+
+    logic = _setting('logic')
+    goals = _setting('goals')
+    gameplay = _setting('gameplay')
+    difficulty = _setting('difficulty')
+
+    def _load_settings(self):
+        source, self._source = self._source, None
+        self._logic = intern_settings(source.get('logic'))
+        self._goals = intern_settings(source.get('goals'))
+        self._gameplay = intern_settings(source.get('gameplay'))
+        self._difficulty = intern_settings(source.get('difficulty'))
+    
+    async def claim(self):
+        return await self.game.raw_send(
+            payload = {
+                'type': MessageType.WorldClaim.value,
+                'world': self.world,
+                'claim': True,
+            }
+        )
+
+    async def unclaim(self):
+        return await self.game.raw_send(
+            payload = {
+                'type': MessageType.WorldClaim.value,
+                'world': self.world,
+                'claim': False,
+            }
         )
\ No newline at end of file
@@ -0,0 +1,258 @@
+import asyncio
+import collections
+import logging
+
+from pyz3multi.exceptions import ConnectionLimitReached
+from pyz3multi.metrics import frame_extra
+from pyz3multi.ratelimit import TokenBucket
+from pyz3multi.types import MessageType
+
+log = logging.getLogger(__name__)
+
+# priority lanes, most urgent first
+CONTROL, CLAIM, CHAT, BULK = range(4)
+
+# lane for each MessageType; anything not listed goes in with chat
+PRIORITIES = {
+    MessageType.Kick.value: CONTROL,
+    MessageType.Destroy.value: CONTROL,
+    MessageType.Knock.value: CONTROL,
+    MessageType.Create.value: CONTROL,
+    MessageType.LobbyRequest.value: CONTROL,
+    MessageType.WorldClaim.value: CLAIM,
+    MessageType.RequestItem.value: CLAIM,
+    MessageType.AcquireItem.value: CLAIM,
+    MessageType.Chat.value: CHAT,
+    MessageType.ImportRecords.value: BULK,
+}
+
+def coalesce_key(payload):
+    """Return the key under which a queued payload supersedes an older one.
+
+    Only the latest WorldClaim for a world matters, and a second LobbyRequest
+    or Knock waiting behind the first adds nothing.
+    """
+    message_type = payload['type']
+    if message_type == MessageType.WorldClaim.value:
+        return (message_type, payload['world'])
+    if message_type in (MessageType.LobbyRequest.value, MessageType.Knock.value):
+        return (message_type,)
+    return None
+
+async def _counted(fragments, size):
+    async for fragment in fragments:
+        size[0] += len(fragment)
+        yield fragment
+
+class SendQueue():
+    """A connection's outbound frames, written by a single writer task.
+
+    Callers enqueue and move on; the writer opens the socket on demand and
+    waits out reconnections without dropping anything.  Frames enqueued
+    while the connection is being (re)established are treated as its
+    handshake and go out before anything else.  After that, frames are
+    sent from the most urgent lane in ``priorities`` (control, then claims,
+    then chat, then bulk imports), in order within a lane.
+
+    With a ``rate``, frames outside the control lane wait for a token from
+    a bucket refilled at ``rate`` per second and holding ``burst``, so a
+    chat flood can't starve a Kick.  A streamed import still has the socket
+    to itself until it's done, since websocket fragments can't be
+    interleaved with other messages.
+    """
+
+    priorities = PRIORITIES
+
+    def __init__(self, client, flush_timeout=5, rate=None, burst=None):
+        self.client = client
+        self.flush_timeout = flush_timeout
+        self.handshake = False
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+        self._handshake = collections.deque()
+        # lane number -> deque, made on first use; most games only ever use one or two
+        self._lanes = {}
+        self._keys = {}
+        # the events are made inside the loop on first use: before 3.10
+        # they bind to whatever loop is current when they're created, and
+        # bots are usually built before asyncio.run() starts theirs
+        self._ready = None
+        self._wakeup = None
+        self._task = None
+
+    @property
+    def ready(self):
+        """Set whenever the connection isn't in the middle of (re)connecting."""
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        return self._ready
+
+    def __len__(self):
+        return len(self._handshake) + sum(len(lane) for lane in self._lanes.values())
+
+    def _entries(self):
+        entries = list(self._handshake)
+        for lane in sorted(self._lanes):
+            entries.extend(self._lanes[lane])
+        return entries
+
+    def put(self, frame, key=None, description=None, message_type=None):
+        """Queue ``frame`` and return a future that resolves once it's written.
+
+        ``frame`` is a str, or an async iterable of str fragments for
+        streamed payloads.  A frame with the same ``key`` as one still
+        waiting replaces it in place.
+        """
+        description = frame if description is None else description
+        if key is not None and key in self._keys:
+            entry = self._keys[key]
+            entry[0] = frame
+            entry[2] = description
+            if self.handshake and entry in self._lanes.get(entry[5], ()):
+                # a resumed session only needs it once, but it has to go first
+                self._lanes[entry[5]].remove(entry)
+                self._handshake.append(entry)
+            return entry[1]
+
+        lane = self.priorities.get(message_type, CHAT)
+        entry = [frame, asyncio.get_event_loop().create_future(), description, key, message_type, lane]
+        if key is not None:
+            self._keys[key] = entry
+        if self.handshake:
+            self._handshake.append(entry)
+        else:
+            queue = self._lanes.get(lane)
+            if queue is None:
+                queue = self._lanes[lane] = collections.deque()
+            queue.append(entry)
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return entry[1]
+
+    def _head(self):
+        if self._handshake:
+            return self._handshake[0]
+        for lane in range(BULK + 1):
+            queue = self._lanes.get(lane)
+            if queue:
+                return queue[0]
+        return None
+
+    async def _next(self):
+        while not len(self):
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        return self._head()
+
+    def _pop(self, entry):
+        (self._handshake if self._handshake and self._handshake[0] is entry else self._lanes[entry[5]]).popleft()
+        if entry[3] is not None:
+            self._keys.pop(entry[3], None)
+
+    async def _wait_open(self):
+        client = self.client
+        while client.socket is None or not client.socket.open:
+            reconnect = client.bot.reconnects.task(client)
+            if reconnect is not None:
+                await asyncio.wait([reconnect])
+            elif client.socket is None:
+                # nothing's open or reconnecting, open it ourselves
+                await client.connect()
+                if client.socket is None:
+                    client.bot.reconnects.schedule(client)
+            elif client._listener is None:
+                # nothing's reading the socket to notice it dropped
+                client.bot.reconnects.schedule(client)
+            else:
+                # the listener noticed the drop and is reconnecting, connect()
+                # sets ready whether or not that works out
+                self.ready.clear()
+                await self.ready.wait()
+
+    async def _run(self):
+        while True:
+            entry = await self._next()
+            try:
+                await self._wait_open()
+            except ConnectionLimitReached as e:
+                # no socket to be had; fail what's queued rather than wait on it
+                log.warning(f'{e}, dropping {len(self)} queued payloads')
+                self._drop(e)
+                continue
+            if self.bucket is not None and not self._handshake and entry[5] != CONTROL:
+                await self.bucket.acquire()
+            # connecting may have queued a handshake, or something more
+            # urgent may have turned up while we waited
+            entry = self._head()
+            if entry is None:
+                continue
+            frame, future, description, key, message_type, lane = entry
+            if key is not None:
+                # it's in flight now, later payloads mustn't fold into it
+                self._keys.pop(key, None)
+                entry[3] = None
+
+            socket = self.client.socket
+            size = [len(frame)] if isinstance(frame, str) else [0]
+            try:
+                await socket.send(frame if isinstance(frame, str) else _counted(frame, size))
+            except Exception as e:
+                if isinstance(frame, str) and not socket.open:
+                    # keep it at the head of the queue for when we're back
+                    log.warning(f'Send to {self.client.endpoint} failed, holding payload until reconnected')
+                    self.ready.clear()
+                    continue
+                # streamed frames can't be replayed
+                log.error(f'Failed to send payload to {self.client.endpoint}', exc_info=True)
+                self._pop(entry)
+                if not future.done():
+                    future.set_exception(e)
+                continue
+
+            self._pop(entry)
+            self.client.bot.connections.touch(self.client)
+            self.client.bot.metrics.frame('out', message_type, size[0])
+            if log.isEnabledFor(logging.INFO):
+                log.info('Payload sent to %s - %s', self.client.endpoint, description, extra=frame_extra('out', self.client.endpoint, message_type))
+            if not future.done():
+                future.set_result(None)
+
+    async def drain(self, timeout=None):
+        """Wait up to ``timeout`` seconds for what's queued now to go out.
+
+        Returns whether all of it was written.
+        """
+        futures = [entry[1] for entry in self._entries()]
+        if futures and self._task is not None and not self._task.done():
+            await asyncio.wait(futures, timeout=timeout)
+        return all(f.done() and not f.cancelled() and f.exception() is None for f in futures)
+
+    async def flush(self, timeout=None):
+        """Give queued frames up to ``timeout`` seconds to go out, then drop the rest."""
+        await self.drain(self.flush_timeout if timeout is None else timeout)
+        self.stop()
+
+    def _drop(self, exc=None):
+        """Empty the queue, failing each frame's future with ``exc`` or cancelling it."""
+        dropped = self._entries()
+        self._handshake.clear()
+        self._lanes.clear()
+        self._keys.clear()
+        for entry in dropped:
+            if entry[1].done():
+                continue
+            if exc is None:
+                entry[1].cancel()
+            else:
+                entry[1].set_exception(exc)
+        return dropped
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        dropped = self._drop()
+        if dropped:
+            log.warning(f'Dropped {len(dropped)} unsent payloads for {self.client.endpoint}')
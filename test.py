@@ -1,6 +1,5 @@
 import asyncio
 import functools
-import gzip
 import json
 import logging
 import os
@@ -12,11 +11,13 @@ import aiohttp
 from dotenv import load_dotenv
 
 from pyz3multi.bot import MultiworldBot
+from pyz3multi.logs import setup_logging
+from pyz3multi.seedgen import SeedGenerator
 from pyz3multi.types import GameMode, ImportType, ItemType, MessageType
 
 load_dotenv()
 
-logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
+listener = setup_logging(logging.DEBUG, stream=sys.stdout, structured=False)
 log = logging.getLogger(__name__)
 
 multiworldbot = MultiworldBot(
@@ -24,6 +25,11 @@ multiworldbot = MultiworldBot(
     name=os.getenv("BOT_NAME")
 )
 
+seeds = SeedGenerator(
+    url='https://v311test.synack.live/api/multiworld',
+    auth=aiohttp.BasicAuth(os.getenv("SITE_USERNAME"), os.getenv("SITE_PASSWORD"))
+)
+
 async def console():
     while True:
         try:
@@ -38,7 +44,11 @@ async def console():
             
             if command[0] == 'connect':
                 game = multiworldbot.get_game(command[1])
-                await game.connect()
+                await multiworldbot.subscribe(game)
+
+            if command[0] == 'disconnect':
+                game = multiworldbot.get_game(command[1])
+                await multiworldbot.unsubscribe(game)
 
             if command[0] == 'destroy':
                 game = multiworldbot.get_game(command[1])
@@ -81,7 +91,7 @@ async def console():
             log.error("A problem occured while processing a commandline function.", exc_info=True)
 
 async def fire_after_room_creation(game):
-    await game.connect()
+    await multiworldbot.subscribe(game)
     settings = {
         "worlds":{
             "1":{
@@ -129,19 +139,8 @@ async def fire_after_room_creation(game):
         },
         "lang":"en"
     }
-    async with aiohttp.request(
-        method='post',
-        url='https://v311test.synack.live/api/multiworld',
-        json=settings,
-        auth=aiohttp.BasicAuth(os.getenv("SITE_USERNAME"), os.getenv("SITE_PASSWORD"))
-    ) as resp:
-        print(resp)
-        binary = await resp.read()
-    records = gzip.decompress(binary).decode('utf-8')
-    await game.import_records(records)
+    await seeds.import_into(game, settings)
 
 if __name__ == "__main__":
-    loop = asyncio.get_event_loop()
-    loop.create_task(multiworldbot.start())
-    loop.create_task(console())
-    loop.run_forever()
+    multiworldbot.run(console())
+    listener.stop()
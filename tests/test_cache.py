@@ -0,0 +1,35 @@
+import asyncio
+
+from pyz3multi import codec
+from pyz3multi.bot import MultiworldBot
+from pyz3multi.cache import StateCache
+from pyz3multi.types import MessageType
+
+def description(world, logic):
+    return codec.dumps({
+        'type': MessageType.WorldDescription.value, 'world': world, 'title': f'World {world}', 'description': '', 'rng': 'x',
+        'logic': logic, 'goals': {'goal': 'ganon'}, 'gameplay': {}, 'difficulty': {'items': 'normal'},
+    })
+
+def test_save_leaves_lazy_settings_undecoded(tmp_path):
+    async def main():
+        bot = MultiworldBot('token', 'name')
+        lobby = {'game': 'g', 'name': 'room', 'worldCount': 2, 'mode': 2, 'created': 1}
+        await bot.lobby.update_game(lobby)
+        game = bot.get_game('g')
+        await game.on_world_description(codec.LazyPayload(description(1, {'glitches': 'none'})))
+        await game.on_world_description(codec.loads(description(2, {'glitches': 'owg'})))
+
+        cache = StateCache(str(tmp_path / 'state.db'))
+        await cache.save(bot)
+        assert game.worlds[1]._source is not None
+
+        restored = MultiworldBot('token', 'name')
+        assert await cache.load(restored) == {'g'}
+        worlds = restored.get_game('g').worlds
+        assert dict(worlds[1].logic) == {'glitches': 'none'}
+        assert dict(worlds[2].logic) == {'glitches': 'owg'}
+        assert dict(worlds[1].goals) == {'goal': 'ganon'}
+        assert dict(worlds[1].gameplay) == {}
+
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+from pyz3multi import codec
+
+def dump(obj, redact=('sender', 'password'), truncate=None):
+    original = codec.LazyDump.redact, codec.LazyDump.truncate
+    codec.LazyDump.redact, codec.LazyDump.truncate = frozenset(redact), truncate
+    try:
+        return str(codec.LazyDump(obj))
+    finally:
+        codec.LazyDump.redact, codec.LazyDump.truncate = original
+
+def test_encoded_frame_is_redacted_in_place():
+    frame = codec.dumps({'type': 240, 'body': 'the "sender" said hi', 'nested': {'sender': 'x'}, 'sender': 'token', 'password': 'pw'})
+    assert codec.loads(dump(frame)) == {
+        'type': 240, 'body': 'the "sender" said hi', 'nested': {'sender': '<redacted>'},
+        'sender': '<redacted>', 'password': '<redacted>',
+    }
+
+def test_string_values_are_not_mistaken_for_keys():
+    frame = codec.dumps({'body': 'x"sender', 'note': '"password": 1', 'list': ['sender', ':']})
+    assert dump(frame) == frame
+
+def test_encoded_frame_without_redacted_keys_is_logged_as_is():
+    frame = '{"type": 240, "body": "hi"}'
+    assert dump(frame) == frame
+    assert dump(frame, truncate=5) == '{"typ... (27 chars)'
+
+def test_lazy_payload_is_redacted_without_decoding():
+    payload = codec.LazyPayload(codec.dumps({'type': 22, 'sender': 'token', 'logic': {'a': 1}}))
+    assert codec.loads(dump(payload)) == {'type': 22, 'sender': '<redacted>', 'logic': {'a': 1}}
+    assert payload._decoded is None
+
+def test_dicts_are_still_redacted():
+    assert codec.loads(dump({'type': 1, 'sender': 'token'})) == {'type': 1, 'sender': '<redacted>'}
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+
+from pyz3multi.bot import MultiworldBot
+from pyz3multi.exceptions import ConnectionLimitReached
+from pyz3multi.mockserver import MockMultiworldServer
+
+async def started_bot(server, rooms, **kwargs):
+    for i in range(rooms):
+        server.add_room(name=f'Room {i}')
+    bot = MultiworldBot('token', 'name', base_address=server.base_address, **kwargs)
+    await bot.start()
+    for _ in range(200):
+        if len(bot.games) == rooms:
+            break
+        await asyncio.sleep(0.01)
+    return bot, list(bot.games.values())
+
+def test_lobby_does_not_count_against_the_cap():
+    async def main():
+        server = await MockMultiworldServer().start()
+        try:
+            bot, games = await started_bot(server, 2, max_connections_per_host=2)
+            await asyncio.gather(*[bot.subscribe(game) for game in games])
+            assert all(game.socket is not None for game in games)
+            assert bot.connections.open_count == 3
+            await bot.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(main())
+
+def test_subscribing_past_the_cap_raises():
+    async def main():
+        server = await MockMultiworldServer().start()
+        try:
+            bot, games = await started_bot(server, 3, max_connections_per_host=2, connection_slot_timeout=0.2)
+            await bot.subscribe(games[0])
+            await bot.subscribe(games[1])
+            start = time.monotonic()
+            with pytest.raises(ConnectionLimitReached):
+                await bot.subscribe(games[2])
+            assert time.monotonic() - start < 2
+            assert not bot.connections.is_subscribed(games[2])
+
+            # a send fails the same way instead of blocking the writer
+            with pytest.raises(ConnectionLimitReached):
+                await (await games[2].chat('hi'))
+
+            # and goes through once a slot is free
+            await bot.unsubscribe(games[0])
+            await bot.subscribe(games[2])
+            await (await games[2].chat('hi'))
+            await bot.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+import asyncio
+
+from pyz3multi.fleet import FleetBot, shard_path
+from pyz3multi.mockserver import MockMultiworldServer
+
+async def wait_for(predicate, timeout=10):
+    for _ in range(int(timeout / 0.02)):
+        if predicate():
+            return
+        await asyncio.sleep(0.02)
+    assert predicate()
+
+def test_shard_path_keeps_compression_suffix():
+    assert shard_path('session.rec', 2) == 'session-shard2.rec'
+    assert shard_path('/tmp/session.rec.gz', 0) == '/tmp/session-shard0.rec.gz'
+    assert shard_path('session.zst', 1) == 'session-shard1.zst'
+
+def test_shards_get_their_own_recording_and_no_state_cache(tmp_path):
+    bot = FleetBot(
+        'token', 'name', shards=2,
+        state_path=str(tmp_path / 'state.db'),
+        record_path=str(tmp_path / 'session.rec'),
+        request_timeout=5
+    )
+    try:
+        kwargs = [bot.shard_kwargs(index) for index in range(2)]
+        assert all('state_path' not in shard for shard in kwargs)
+        assert [shard['record_path'] for shard in kwargs] == [
+            str(tmp_path / 'session-shard0.rec'),
+            str(tmp_path / 'session-shard1.rec'),
+        ]
+        assert all(shard['request_timeout'] == 5 for shard in kwargs)
+    finally:
+        bot.recorder.close()
+
+def test_parent_registry_sees_shard_worlds_and_claims():
+    async def main():
+        server = await MockMultiworldServer(world_count=2).start()
+        bot = FleetBot('token', 'name', shards=2, base_address=server.base_address, request_timeout=10)
+        try:
+            rooms = [server.add_room(name=f'Room {i}') for i in range(3)]
+            await bot.start()
+            await wait_for(lambda: len(bot.games) == 3)
+            assert len(bot.games.open_rooms()) == 3
+
+            for room in rooms:
+                await bot.subscribe(bot.games[room.guid])
+            await wait_for(lambda: all(len(bot.games[room.guid].worlds) == 2 for room in rooms))
+
+            game = bot.games[rooms[0].guid]
+            await bot.claim_many(list(game.worlds.values())).wait()
+            await wait_for(lambda: all(world.claimed for world in game.worlds.values()))
+            assert {g.game for g in bot.games.open_rooms()} == {rooms[1].guid, rooms[2].guid}
+            assert bot.games.find(unclaimed=False) == [game]
+            # nothing was opened in the parent apart from the lobby
+            assert bot.connections.open_count == 1
+        finally:
+            await bot.close()
+            await server.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+import pytest
+
+from pyz3multi import oneshot
+from pyz3multi.exceptions import pyz3multiException
+from pyz3multi.mockserver import MockMultiworldServer
+from pyz3multi.types import MessageType
+
+def test_command_against_unreachable_service_times_out():
+    async def main():
+        bot = oneshot.make_bot('token', 'name', base_address='ws://localhost:1')
+        start = time.monotonic()
+        with pytest.raises(pyz3multiException):
+            await oneshot.run(bot, oneshot.chat, 'guid', 'hi', timeout=1)
+        assert time.monotonic() - start < 5
+
+    asyncio.run(main())
+
+def test_commands_send_without_listening_or_a_lobby_snapshot():
+    async def main():
+        server = await MockMultiworldServer().start()
+        try:
+            bot = oneshot.make_bot('token', 'name', base_address=server.base_address)
+            await oneshot.run(bot, oneshot.create, 'room', 'description')
+            guid = next(iter(server.rooms))
+
+            bot = oneshot.make_bot('token', 'name', base_address=server.base_address)
+            await oneshot.run(bot, oneshot.chat, guid, 'hi')
+            assert bot.games[guid].dispatcher is None
+
+            await asyncio.sleep(0.1)
+            assert server.received.get(MessageType.Chat.value) == 1
+            assert MessageType.LobbyRequest.value not in server.received
+        finally:
+            await server.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from pyz3multi.exceptions import PendingRequestEvicted
+from pyz3multi.pending import PendingRequests
+
+def test_register_evicts_oldest_past_max_pending():
+    async def main():
+        pending = PendingRequests(max_pending=2)
+        first = pending.register(0, aliases=('a',))
+        second = pending.register(1)
+        # this used to spin forever re-rejecting request 0
+        third = pending.register(2)
+
+        assert len(pending) == 2
+        assert 0 not in pending and 'a' not in pending
+        assert 1 in pending and 2 in pending
+        with pytest.raises(PendingRequestEvicted):
+            await first
+        assert not second.done() and not third.done()
+
+        # the late done callback mustn't touch anything
+        await asyncio.sleep(0)
+        assert len(pending) == 2
+        pending.cancel_all()
+
+    asyncio.run(main())
+
+def test_eviction_keeps_up_with_many_registrations():
+    async def main():
+        pending = PendingRequests(max_pending=10)
+        futures = [pending.register(key) for key in range(100)]
+        assert len(pending) == 10
+        evicted = [f for f in futures if f.done()]
+        assert len(evicted) == 90
+        assert all(isinstance(f.exception(), PendingRequestEvicted) for f in evicted)
+        assert pending.resolve(99, 'ok')
+        assert await futures[99] == 'ok'
+        pending.cancel_all()
+
+    asyncio.run(main())
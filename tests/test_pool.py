@@ -0,0 +1,22 @@
+from pyz3multi.bot import MultiworldBot
+from pyz3multi.pool import BotPool, PoolIdentity
+
+def test_identity_sets_every_bot_attribute():
+    # a new MultiworldBot attribute has to be either listed in
+    # PoolIdentity.SHARED or made per identity in its __init__
+    pool = BotPool('pool', 'Pool')
+    identity = pool.identity('token', 'Identity')
+    missing = set(vars(MultiworldBot('token', 'name'))) - set(vars(identity))
+    assert not missing
+
+def test_identity_shares_only_what_it_lists():
+    pool = BotPool('pool', 'Pool', bulk_rate=5)
+    identity = pool.identity('token', 'Identity')
+    assert isinstance(identity, PoolIdentity)
+    for attr in ('lobby', 'connections', 'reconnects', 'metrics', 'events'):
+        assert getattr(identity, attr) is getattr(pool, attr)
+    assert identity.games is not pool.games
+    assert identity.bulk is not pool.bulk and identity.bulk.rate == 5
+    assert identity.state is None
+    assert not hasattr(identity, 'identities')
+    assert pool.identity('token', 'Identity') is identity
@@ -0,0 +1,49 @@
+import asyncio
+import gzip
+
+from pyz3multi import codec, records
+
+TEXT = '{"records": [{"name": "Zoë \\"the\\" Ganon", "note": "línea\\n\\ttab"}], "title": "ゼルダの伝説 🗡️", "ctrl": "\x01\x7f"}' * 50
+PAYLOAD = {'type': 22, 'importType': 1, 'id': 'abc'}
+
+async def chunks(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def collect(source, chunk_size=records.CHUNK_SIZE, payload=PAYLOAD):
+    async def main():
+        return ''.join([f async for f in records.json_string_fragments(payload, 'body', source, chunk_size)])
+    return asyncio.run(main())
+
+def expected(text=TEXT, payload=PAYLOAD):
+    return codec.dumps({**payload, 'body': text})
+
+def test_fragments_match_dumps_for_plain_and_gzipped_bytes():
+    raw = TEXT.encode('utf-8')
+    packed = gzip.compress(raw)
+    for chunk_size in (1, 2, 3, 7, 64, records.CHUNK_SIZE):
+        assert collect(raw, chunk_size) == expected(), chunk_size
+        assert collect(packed, chunk_size) == expected(), chunk_size
+
+def test_fragments_match_dumps_for_async_iterators_and_files(tmp_path):
+    raw = TEXT.encode('utf-8')
+    packed = gzip.compress(raw)
+    for size in (1, 5, 4096):
+        # multi-byte characters and the gzip header are split between chunks
+        assert collect(chunks(raw, size)) == expected(), size
+        assert collect(chunks(packed, size)) == expected(), size
+
+    path = tmp_path / 'records.json.gz'
+    path.write_bytes(packed)
+    assert collect(path, 100) == expected()
+
+def test_short_and_empty_input():
+    assert collect(b'') == expected('')
+    assert collect(b'x') == expected('x')
+    assert collect(chunks(gzip.compress(b''), 1)) == expected('')
+    assert collect(b'hi', payload={}) == codec.dumps({'body': 'hi'})
+
+def test_iter_text_decodes_split_characters():
+    async def main():
+        return [text async for text in records.iter_text(chunks('é🗡'.encode('utf-8'), 1))]
+    assert ''.join(asyncio.run(main())) == 'é🗡'
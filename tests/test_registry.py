@@ -0,0 +1,127 @@
+import random
+from types import SimpleNamespace
+
+from pyz3multi.registry import GameRegistry
+from pyz3multi.types import GameMode
+
+MULTIWORLD = GameMode.Multiworld.value
+
+def make_game(guid, mode=MULTIWORLD, has_password=False, world_count=2, created=0, claimed=()):
+    worlds = {world: SimpleNamespace(claimed=world in claimed) for world in range(1, world_count + 1)}
+    return SimpleNamespace(
+        game=guid, mode=mode, has_password=has_password,
+        world_count=world_count, _created=created, worlds=worlds
+    )
+
+def guids(games):
+    return [game.game for game in games]
+
+def test_reindex_moves_games_between_indexes():
+    registry = GameRegistry()
+    game = make_game('a', created=1)
+    registry['a'] = game
+    registry['b'] = make_game('b', has_password=True, world_count=3, created=2)
+    assert guids(registry.open_rooms()) == ['a']
+
+    game.mode, game.has_password, game.world_count = 99, True, 3
+    registry.reindex(game, {'mode': (MULTIWORLD, 99), 'has_password': (False, True), 'world_count': (2, 3)})
+    assert registry.find(mode=MULTIWORLD) == [registry['b']]
+    assert registry.find(mode=99) == [game]
+    assert guids(registry.find(has_password=True)) == ['b', 'a']
+    assert registry.find(has_password=False) == []
+    assert guids(registry.find(world_count=3)) == ['b', 'a']
+    assert registry.find(world_count=2) == []
+    assert not registry._by_world_count.get(2)
+
+def test_worlds_changed_tracks_unclaimed_worlds():
+    registry = GameRegistry()
+    game = make_game('a', world_count=2)
+    game.worlds = {}
+    registry['a'] = game
+    # worlds the game hasn't described yet count as unclaimed
+    assert registry.find(unclaimed=True) == [game]
+
+    game.worlds = {1: SimpleNamespace(claimed=True), 2: SimpleNamespace(claimed=True)}
+    registry.worlds_changed(game)
+    assert registry.find(unclaimed=True) == []
+    assert registry.find(unclaimed=False) == [game]
+
+    game.worlds[2].claimed = False
+    registry.worlds_changed(game)
+    assert registry.open_rooms() == [game]
+
+    # raising the world count reopens a full room
+    game.worlds[2].claimed = True
+    registry.worlds_changed(game)
+    game.world_count = 3
+    registry.reindex(game, {'world_count': (2, 3)})
+    assert registry.open_rooms() == [game]
+
+def test_delete_and_re_add():
+    registry = GameRegistry()
+    registry['a'] = make_game('a', created=5, claimed=(1, 2))
+    registry['b'] = make_game('b', created=6)
+    del registry['a']
+    assert 'a' not in registry and len(registry) == 1
+    assert registry.find(unclaimed=False) == []
+    assert 'a' not in registry._created and all(guid != 'a' for _, guid in registry._by_created)
+
+    registry['a'] = make_game('a', mode=99, has_password=True, created=7)
+    assert guids(registry.find()) == ['a', 'b']
+    assert guids(registry.find(mode=99)) == ['a']
+    assert guids(registry.find(has_password=False)) == ['b']
+
+    # replacing a game under the same GUID drops the old one's entries
+    registry['a'] = make_game('a', created=1, claimed=(1, 2))
+    assert guids(registry.find()) == ['b', 'a']
+    assert registry.find(mode=99) == []
+    assert guids(registry.find(unclaimed=False)) == ['a']
+    assert len(registry._by_created) == 2
+
+    # lobby updates for games that are gone are ignored
+    gone = make_game('gone')
+    registry.reindex(gone, {'mode': (MULTIWORLD, 99)})
+    registry.worlds_changed(gone)
+    assert 'gone' not in registry
+
+def test_find_matches_a_full_scan_on_both_paths():
+    rng = random.Random(1)
+    registry = GameRegistry()
+    for i in range(200):
+        world_count = rng.randint(1, 3)
+        game = make_game(
+            f'g{i:03}',
+            mode=rng.choice([MULTIWORLD, 99]),
+            has_password=rng.random() < 0.2,
+            world_count=world_count,
+            created=rng.randint(0, 50),
+            claimed=[w for w in range(1, world_count + 1) if rng.random() < 0.5]
+        )
+        registry[game.game] = game
+
+    def scan(mode=None, has_password=None, world_count=None, unclaimed=None, newest_first=True, limit=None):
+        mode = getattr(mode, 'value', mode)
+        games = [
+            game for game in registry.values()
+            if (mode is None or game.mode == mode)
+            and (has_password is None or game.has_password == has_password)
+            and (world_count is None or game.world_count == world_count)
+            and (unclaimed is None or unclaimed == any(not w.claimed for w in game.worlds.values()))
+        ]
+        games.sort(key=lambda game: (game._created, game.game), reverse=newest_first)
+        return games if limit is None else games[:limit]
+
+    queries = [
+        {},
+        {'mode': MULTIWORLD},
+        {'mode': GameMode.Multiworld, 'has_password': False, 'unclaimed': True},
+        {'world_count': 3, 'unclaimed': False},
+        {'has_password': True, 'mode': 99},
+    ]
+    for query in queries:
+        for newest_first in (True, False):
+            # no limit, a limit over a large match set (walks the time index)
+            # and a limit over a small one (sorts the matches)
+            for limit in (None, 5, 1000):
+                kwargs = dict(query, newest_first=newest_first, limit=limit)
+                assert guids(registry.find(**kwargs)) == guids(scan(**kwargs)), kwargs
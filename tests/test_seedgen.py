@@ -0,0 +1,36 @@
+import concurrent.futures
+import os
+
+from pyz3multi.seedgen import SeedCache
+
+def fill(cache, seeds, size=100):
+    for key in ('a', 'b'):
+        folder = cache.directory / key
+        folder.mkdir(parents=True, exist_ok=True)
+        for i in range(seeds):
+            (folder / f'{key}{i}.gz').write_bytes(b'x' * size)
+
+def test_concurrent_evictions_and_claims_do_not_fail(tmp_path):
+    for _ in range(20):
+        cache = SeedCache(tmp_path / 'seeds', max_bytes=50)
+        fill(cache, 200, size=10)
+        with concurrent.futures.ThreadPoolExecutor(6) as pool:
+            futures = [pool.submit(cache.evict) for _ in range(4)]
+            futures += [pool.submit(cache.take, key) for key in ('a', 'b')]
+            for future in futures:
+                future.result()
+        left = [p for key in ('a', 'b') for p in cache.seeds(key)]
+        assert sum(os.path.getsize(p) for p in left) <= 50
+        for path in (cache.directory / 'taken').iterdir():
+            path.unlink()
+        for path in left:
+            path.unlink()
+
+def test_seeds_are_oldest_first(tmp_path):
+    cache = SeedCache(tmp_path)
+    fill(cache, 3)
+    for i, path in enumerate(sorted((tmp_path / 'a').iterdir())):
+        os.utime(path, (1000 - i, 1000 - i))
+    assert [p.name for p in cache.seeds('a')] == ['a2.gz', 'a1.gz', 'a0.gz']
+    assert cache.take('a').name == 'a2.gz'
+    assert cache.seeds('missing') == []
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import pickle
+
+import pytest
+
+from pyz3multi import codec
+from pyz3multi.bot import MultiworldBot
+from pyz3multi.mockserver import MockMultiworldServer
+from pyz3multi.types import MessageType
+from pyz3multi.websocket import intern_settings
+
+def test_listener_skips_frames_it_cannot_read():
+    async def main():
+        server = await MockMultiworldServer().start()
+        try:
+            room = server.add_room()
+            bot = MultiworldBot('token', 'name', base_address=server.base_address)
+            await bot.start()
+            while room.guid not in bot.games:
+                await asyncio.sleep(0.01)
+            game = bot.games[room.guid]
+            chats = []
+
+            @bot.on(MessageType.Chat.value)
+            async def on_chat(client, payload):
+                chats.append(payload['body'])
+
+            await bot.subscribe(game)
+            while not room.sockets:
+                await asyncio.sleep(0.01)
+            for frame in ('[1, 2]', 'not json', '"just a string"'):
+                await asyncio.gather(*[ws.send(frame) for ws in room.sockets])
+            server.broadcast(room.sockets, {'type': MessageType.Chat.value, 'body': 'still here'})
+
+            for _ in range(100):
+                if chats:
+                    break
+                await asyncio.sleep(0.01)
+            assert chats == ['still here']
+            assert not game._listener.done()
+            await bot.close()
+        finally:
+            await server.stop()
+
+    asyncio.run(main())
+
+def test_interned_settings_are_shared_plain_json():
+    logic = intern_settings({'glitches': 'none', 'items': {'sword': 'random'}})
+    assert logic is intern_settings({'glitches': 'none', 'items': {'sword': 'random'}})
+    assert isinstance(logic, dict)
+    assert json.loads(json.dumps(logic)) == logic
+    assert codec.loads(codec.dumps({'logic': logic})) == {'logic': logic}
+    assert pickle.loads(pickle.dumps(logic)) == logic
+    with pytest.raises(TypeError):
+        logic['glitches'] = 'owg'
+    with pytest.raises(TypeError):
+        logic.update(glitches='owg')
+    assert dict(logic, glitches='owg')['glitches'] == 'owg'
+    assert intern_settings(None) == {}
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+from pyz3multi.connection import ConnectionManager
+from pyz3multi.metrics import Metrics
+from pyz3multi.reconnect import ReconnectScheduler
+from pyz3multi.types import MessageType
+from pyz3multi.writer import SendQueue, coalesce_key
+
+CHAT = MessageType.Chat.value
+CLAIM = MessageType.WorldClaim.value
+KNOCK = MessageType.Knock.value
+KICK = MessageType.Kick.value
+
+class FakeSocket():
+    def __init__(self, client, failures=0):
+        self.client = client
+        self.failures = failures
+        self.open = True
+
+    async def send(self, frame):
+        if self.failures:
+            self.failures -= 1
+            self.open = False
+            raise ConnectionResetError('dropped')
+        self.client.sent.append(frame)
+
+class FakeBot():
+    def __init__(self):
+        self.reconnects = ReconnectScheduler(rate=100, burst=100, base=0)
+        self.connections = ConnectionManager()
+        self.metrics = Metrics()
+
+class FakeClient():
+    """Just enough of a BasicMultiworldClient for SendQueue; connect() waits for ``allow``."""
+
+    endpoint = 'api/game/test'
+
+    def __init__(self, failures=()):
+        self.bot = FakeBot()
+        self.socket = None
+        self._listener = None
+        self.sent = []
+        self.allow = asyncio.Event()
+        # how many sends fail on each socket opened, in order
+        self.failures = list(failures)
+
+    async def connect(self):
+        await self.allow.wait()
+        self.socket = FakeSocket(self, self.failures.pop(0) if self.failures else 0)
+
+def claim(queue, world, claim):
+    payload = {'type': CLAIM, 'world': world, 'claim': claim}
+    return queue.put(f'claim {world} {claim}', key=coalesce_key(payload), message_type=CLAIM)
+
+def test_claim_then_unclaim_folds_into_one_frame():
+    async def main():
+        client = FakeClient()
+        queue = SendQueue(client)
+        first = claim(queue, 1, True)
+        second = claim(queue, 1, False)
+        other = claim(queue, 2, True)
+        assert first is second and other is not first
+        assert len(queue) == 2
+
+        client.allow.set()
+        await asyncio.wait_for(asyncio.gather(first, other), 1)
+        assert client.sent == ['claim 1 False', 'claim 2 True']
+
+        # once it's been written a new claim is queued on its own
+        third = claim(queue, 1, True)
+        assert third is not first
+        await asyncio.wait_for(third, 1)
+        assert client.sent[-1] == 'claim 1 True'
+
+    asyncio.run(main())
+
+def test_knock_is_moved_ahead_during_the_handshake():
+    async def main():
+        client = FakeClient()
+        queue = SendQueue(client)
+        queue.put('chat', message_type=CHAT)
+        queue.put('kick', message_type=KICK)
+        knock = queue.put('stale knock', key=(KNOCK,), message_type=KNOCK)
+
+        # what a connect handler sends goes out before anything queued earlier
+        queue.handshake = True
+        assert queue.put('knock', key=(KNOCK,), message_type=KNOCK) is knock
+        queue.handshake = False
+        assert len(queue) == 3
+
+        client.allow.set()
+        assert await asyncio.wait_for(queue.drain(), 1)
+        assert client.sent == ['knock', 'kick', 'chat']
+
+    asyncio.run(main())
+
+def test_failed_send_stays_at_the_head_until_reconnected():
+    async def main():
+        client = FakeClient(failures=[1])
+        client.allow.set()
+        queue = SendQueue(client)
+        futures = [queue.put(body, message_type=CHAT) for body in ('a', 'b', 'c')]
+        await asyncio.wait_for(asyncio.gather(*futures), 1)
+        assert client.sent == ['a', 'b', 'c']
+        assert client.bot.reconnects.reconnects == 1
+
+    asyncio.run(main())
+
+def test_flush_cancels_what_could_not_be_sent():
+    async def main():
+        client = FakeClient()
+        queue = SendQueue(client)
+        futures = [queue.put('chat', message_type=CHAT), claim(queue, 1, True)]
+        await queue.flush(timeout=0.05)
+        assert all(future.cancelled() for future in futures)
+        assert len(queue) == 0
+        assert not queue._keys
+        assert client.sent == []
+
+    asyncio.run(main())
+
+def test_lanes_and_rate_limit():
+    async def main():
+        client = FakeClient()
+        client.allow.set()
+        queue = SendQueue(client, rate=20, burst=1)
+        chats = [queue.put(f'chat {i}', message_type=CHAT) for i in range(3)]
+        kicks = [queue.put(f'kick {i}', message_type=KICK) for i in range(3)]
+
+        start = time.monotonic()
+        await asyncio.wait_for(asyncio.gather(*kicks), 1)
+        # control frames don't wait for tokens
+        assert time.monotonic() - start < 0.04
+        await asyncio.wait_for(asyncio.gather(*chats), 1)
+        # the bucket holds one token, the other two chats wait 1/20s each
+        assert time.monotonic() - start >= 0.09
+        assert client.sent == ['kick 0', 'kick 1', 'kick 2', 'chat 0', 'chat 1', 'chat 2']
+
+    asyncio.run(main())